@@ -1,172 +1,252 @@
 import numpy as np
 import pandas as pd
 from strategy import Strategy
+from exit_engine import ExitEngine, find_exits_loop, single_position_mask
+from metrics import METRIC_COLUMNS, batch_metrics, metrics_records
+from trade_log import TradeLog, logs_metrics_block
+from instrumentation import INSTRUMENTS
 
 class Backtester(Strategy):
-    def __init__(self, df, params=None, position_size=1000):
-        super().__init__(df, params)
+    """
+    exit_mode: 'fast' uses the sparse-table ExitEngine,
+               'loop' uses the original bar-by-bar scan (parity checks).
+
+    single_position: one trade at a time like the live bot; signals while
+               a trade is open are skipped (see single_position_mask).
+
+    Trades are kept in self.trades (a compact TradeLog); self.trade_log
+    builds the DataFrame on first access.
+    """
+    def __init__(self, df, params=None, position_size=1000, exit_mode='fast', bank=None,
+                 single_position=False):
+        super().__init__(df, params, bank=bank)
         self.position_size = position_size
+        self.exit_mode = exit_mode
+        self.single_position = single_position
         self.metrics = {}
-        self.trade_log = pd.DataFrame()
+        self.trades = None
+        self._trade_frame = None
+
+    @property
+    def trade_log(self):
+        if self._trade_frame is None:
+            self._trade_frame = self.trades.to_frame() if self.trades is not None else pd.DataFrame()
+        return self._trade_frame
+
+    def _set_trades(self, trades):
+        self.trades = trades
+        self._trade_frame = None
 
     def run_backtest(self):
         self.run_strategy()
-        self.generate_trade_log()
+        self._resolve_trades()
         return self.calculate_metrics()
 
     def generate_trade_log(self):
-        df = self.data.copy()
-        if 'Datetime' not in df.columns:
-            df = df.reset_index()
-            if 'Datetime' not in df.columns and 'index' in df.columns:
-                 df = df.rename(columns={'index': 'Datetime'})
-
-        prices = df['price'].values
-        highs = df['High'].values
-        lows = df['Low'].values
-        datetimes = df['Datetime'].values
-        positions = df['position'].values
-        
-        atr_col = f"ATR_{self.params['atr_period']}"
-        atrs = df[atr_col].values
+        """Resolves the trades and returns them as a DataFrame (also in self.trades as a TradeLog)."""
+        self._resolve_trades()
+        return self.trade_log
+
+    def _resolve_trades(self):
+        arrays = self._trade_arrays()
+        entries = self._entries(arrays)
 
         sl_mult = self.params['sl_multiplier']
         tp_mult = self.params['tp_multiplier']
         be_mult = self.params.get('be_multiplier', 100)
 
-        trades_list = []
+        with INSTRUMENTS.timer('exits'):
+            if self.exit_mode == 'loop':
+                exit_indices, exit_prices = find_exits_loop(
+                    arrays['highs'], arrays['lows'], *entries, sl_mult, tp_mult, be_mult)
+            else:
+                engine = ExitEngine(arrays['highs'], arrays['lows'])
+                exit_indices, exit_prices = engine.find_exits(*entries, sl_mult, tp_mult, be_mult)
+
+        entries, exit_indices, exit_prices = self._one_position(entries, exit_indices, exit_prices)
+        self._set_trades(self._trade_log(arrays, entries, exit_indices, exit_prices))
+
+    def run_exit_variants(self, exit_variants, windows=None, min_trades=None, max_drawdown=None,
+                          as_frame=False):
+        """
+        Runs the signal pipeline once and evaluates every exit variant
+        (dicts of sl/tp/be multipliers) against the same entries.
+        In 'fast' mode all variants are resolved in a single ExitEngine pass.
+        Returns one metrics dict per variant.
+
+        windows: optional list of (start, end, exit_limit) timestamps. Only
+        entries in [start, end) count, and exits at or after exit_limit are
+        discarded (None = no limit). Returns one list of metrics per window.
+
+        min_trades / max_drawdown ($, positive): variants that provably miss
+        the trade floor or breach the drawdown cap get None instead of
+        metrics, without building their trade log.
+
+        as_frame: return a DataFrame block (metrics + exit params, one row
+        per surviving variant) instead of a list of dicts.
+        """
+        self.run_strategy()
+        arrays = self._trade_arrays()
+        entries = self._entries(arrays)
+        datetimes = arrays['datetimes']
+        entry_indices = entries[0]
+
+        spans = [(0, len(datetimes), len(datetimes))] if windows is None else [
+            self._window_span(datetimes, window) for window in windows]
+        masks = [(entry_indices >= lo) & (entry_indices < hi) for lo, hi, _ in spans]
+        # Fewer entries than the floor: no exit can fix that
+        alive = [min_trades is None or mask.sum() >= min_trades for mask in masks]
+        # Exits are only resolved for entries some live window needs
+        needed = np.zeros(len(entry_indices), dtype=bool)
+        for mask, ok in zip(masks, alive):
+            if ok:
+                needed |= mask
+        entries = tuple(e[needed] for e in entries)
+        exits = self._batched_exits(arrays, entries, exit_variants) if any(alive) else []
+
+        per_window = []
+        for (lo, hi, limit), mask, ok in zip(spans, masks, alive):
+            if not ok:
+                per_window.append(pd.DataFrame(columns=METRIC_COLUMNS) if as_frame else [None] * len(exit_variants))
+                continue
+            mask = mask[needed]
+            window_entries = tuple(e[mask] for e in entries)
+            kept, logs = [], []
+            for v, (exit_indices, exit_prices) in enumerate(exits):
+                window_exits = exit_indices[mask]
+                window_exits = np.where(window_exits >= limit, -1, window_exits)
+                variant_entries, window_exits, window_prices = self._one_position(
+                    window_entries, window_exits, exit_prices[mask])
+                if self._pruned(variant_entries, window_exits, window_prices, min_trades, max_drawdown):
+                    continue
+                kept.append(v)
+                logs.append(self._trade_log(arrays, variant_entries, window_exits, window_prices))
+
+            # All surviving variants go through the metrics kernel at once
+            block = logs_metrics_block(logs)
+            if kept:
+                self._set_trades(logs[-1])
+                self.metrics = metrics_records(block.tail(1))[0]
+            if as_frame:
+                for key in (exit_variants[0] if exit_variants else {}):
+                    block[key] = [exit_variants[v][key] for v in kept]
+                per_window.append(block)
+            else:
+                results = [None] * len(exit_variants)
+                for v, metrics in zip(kept, metrics_records(block)):
+                    results[v] = metrics
+                per_window.append(results)
+        return per_window[0] if windows is None else per_window
+
+    def _one_position(self, entries, exit_indices, exit_prices):
+        """Drops the entries a single-position account could not take."""
+        if not self.single_position:
+            return entries, exit_indices, exit_prices
+        keep = single_position_mask(entries[0], exit_indices)
+        return tuple(e[keep] for e in entries), exit_indices[keep], exit_prices[keep]
+
+    @staticmethod
+    def _window_span(datetimes, window):
+        start, end, exit_limit = window
+        lo = np.searchsorted(datetimes, np.datetime64(start)) if start is not None else 0
+        hi = np.searchsorted(datetimes, np.datetime64(end)) if end is not None else len(datetimes)
+        limit = np.searchsorted(datetimes, np.datetime64(exit_limit)) if exit_limit is not None else len(datetimes)
+        return lo, hi, limit
+
+    def _pruned(self, entries, exit_indices, exit_prices, min_trades, max_drawdown):
+        closed = exit_indices != -1
+        if min_trades is not None and closed.sum() < min_trades:
+            return True
+        if max_drawdown is None or not closed.any():
+            return False
+
+        _, entry_types, entry_prices, _ = entries
+        pnl = (exit_prices[closed] - entry_prices[closed]) * entry_types[closed] * self.position_size
+        bars = exit_indices[closed]
+        order = np.argsort(bars, kind='stable')
+        bars, pnl = bars[order], pnl[order]
+        # Equity sampled at the end of each exit bar: the per-trade curve
+        # used by trade_metrics can only dip deeper, so this is a safe bound.
+        last = np.r_[bars[1:] != bars[:-1], True]
+        equity = np.cumsum(pnl)[last]
+        dd = (equity - np.maximum.accumulate(equity)).min()
+        return dd < -max_drawdown
+
+    @INSTRUMENTS.timed('exits')
+    def _batched_exits(self, arrays, entries, exit_variants):
+        """(exit_indices, exit_prices) per exit variant for the same entries."""
+        entry_indices, entry_types, entry_prices, entry_atrs = entries
+
+        n_entries = len(entry_indices)
+        n_variants = len(exit_variants)
+        sl_mults = [v['sl_multiplier'] for v in exit_variants]
+        tp_mults = [v['tp_multiplier'] for v in exit_variants]
+        be_mults = [v.get('be_multiplier', 100) for v in exit_variants]
+
+        if self.exit_mode == 'loop':
+            return [find_exits_loop(arrays['highs'], arrays['lows'],
+                                    entry_indices, entry_types, entry_prices, entry_atrs,
+                                    sl_mults[v], tp_mults[v], be_mults[v])
+                    for v in range(n_variants)]
+
+        engine = ExitEngine(arrays['highs'], arrays['lows'])
+        exit_idx, exit_px = engine.find_exits(
+            np.tile(entry_indices, n_variants), np.tile(entry_types, n_variants),
+            np.tile(entry_prices, n_variants), np.tile(entry_atrs, n_variants),
+            np.repeat(sl_mults, n_entries), np.repeat(tp_mults, n_entries),
+            np.repeat(be_mults, n_entries))
+        exit_idx = exit_idx.reshape(n_variants, n_entries)
+        exit_px = exit_px.reshape(n_variants, n_entries)
+        return list(zip(exit_idx, exit_px))
+
+    def _trade_arrays(self):
+        # Plain column views: no frame copy, no reset_index
+        df = self.data
+        atr_col = f"ATR_{self.params['atr_period']}"
+        return {
+            'prices': df['price'].values,
+            'highs': df['High'].values,
+            'lows': df['Low'].values,
+            'datetimes': df.index.values,
+            'positions': df['position'].values,
+            'atrs': df[atr_col].values,
+        }
+
+    @staticmethod
+    def _entries(arrays):
+        positions = arrays['positions']
         entry_indices = np.where(positions != 0)[0]
+        entry_indices = entry_indices[entry_indices < len(positions) - 1]
+        return (entry_indices, positions[entry_indices],
+                arrays['prices'][entry_indices], arrays['atrs'][entry_indices])
 
-        for idx in entry_indices:
-            if idx >= len(prices) - 1: continue
-            
-            entry_type = positions[idx]
-            entry_price = prices[idx]
-            atr = atrs[idx]
-            entry_time = datetimes[idx]
-            
-            if entry_type == 1: # Long
-                sl = entry_price - (atr * sl_mult)
-                tp = entry_price + (atr * tp_mult)
-                be_trigger = entry_price + (atr * be_mult)
-            else: # Short
-                sl = entry_price + (atr * sl_mult)
-                tp = entry_price - (atr * tp_mult)
-                be_trigger = entry_price - (atr * be_mult)
-            
-            is_be_active = False
-            exit_idx = -1
-            exit_price = entry_price # Default
-            
-            search_highs = highs[idx+1:]
-            search_lows = lows[idx+1:]
-            
-            for i in range(len(search_highs)):
-                current_high = search_highs[i]
-                current_low = search_lows[i]
-                
-                if entry_type == 1: # Long
-                    if current_low <= sl:   # SL
-                        exit_price = sl; exit_idx = idx + 1 + i; break
-                    if current_high >= tp:   # TP
-                        exit_price = tp; exit_idx = idx + 1 + i; break
-                    if not is_be_active and current_high >= be_trigger:
-                        sl = entry_price; is_be_active = True
-                else: # Short
-                    if current_high >= sl:   # SL
-                        exit_price = sl; exit_idx = idx + 1 + i; break
-                    if current_low <= tp:   # TP
-                        exit_price = tp; exit_idx = idx + 1 + i; break
-                    if not is_be_active and current_low <= be_trigger:
-                        sl = entry_price; is_be_active = True
-            
-            if exit_idx != -1:
-                exit_time = datetimes[exit_idx]
-                ts_entry = pd.Timestamp(entry_time)
-                ts_exit = pd.Timestamp(exit_time)
-                duration = ts_exit - ts_entry
-                
-                if entry_type == 1:
-                    pnl_usd = (exit_price - entry_price) * self.position_size
-                else:
-                    pnl_usd = (entry_price - exit_price) * self.position_size
-                
-                trades_list.append({
-                    'entry_time': ts_entry,
-                    'exit_time': ts_exit,
-                    'trade_type': 'Long' if entry_type == 1 else 'Short',
-                    'entry_price': entry_price,
-                    'exit_price': exit_price,
-                    'pnl_usd': pnl_usd,
-                    'duration': duration
-                })
-
-        self.trade_log = pd.DataFrame(trades_list)
-        return self.trade_log
+    def _trade_log(self, arrays, entries, exit_indices, exit_prices):
+        return TradeLog.from_exits(entries, exit_indices, exit_prices, arrays['datetimes'], self.position_size)
 
     def calculate_metrics(self):
         """
         חישוב מורחב של מדדים כולל משך זמן, ממוצעים ורצפים.
         """
-        trades = self.trade_log
-        if trades.empty:
-            return {'Total Trades': 0, 'Total Profit ($)': 0, 'Profit Factor': 0, 'Max Drawdown ($)': 0}
-        
-        total_trades = len(trades)
-        wins = trades[trades['pnl_usd'] > 0]
-        losses = trades[trades['pnl_usd'] <= 0]
-        
-        gross_win = wins['pnl_usd'].sum()
-        gross_loss = abs(losses['pnl_usd'].sum())
-        total_profit = trades['pnl_usd'].sum()
-        
-        profit_factor = gross_win / gross_loss if gross_loss > 0 else 999
-        win_rate = (len(wins) / total_trades) * 100
-        
-        avg_win = wins['pnl_usd'].mean() if not wins.empty else 0
-        avg_loss = losses['pnl_usd'].mean() if not losses.empty else 0
-        risk_reward_ratio = abs(avg_win / avg_loss) if avg_loss != 0 else 0
-        
-        best_trade = trades['pnl_usd'].max()
-        worst_trade = trades['pnl_usd'].min()
-        
-        avg_duration = trades['duration'].mean()
-        
-        trades = trades.sort_values('exit_time')
-        equity = trades['pnl_usd'].cumsum()
-        dd = (equity - equity.cummax()).min()
-
-        is_loss = trades['pnl_usd'] <= 0
-        cons_losses = 0
-        if is_loss.any():
-            cons_losses = is_loss.groupby((is_loss != is_loss.shift()).cumsum()).cumsum()[is_loss].max()
-            
-        is_win = trades['pnl_usd'] > 0
-        cons_wins = 0
-        if is_win.any():
-            cons_wins = is_win.groupby((is_win != is_win.shift()).cumsum()).cumsum()[is_win].max()
-
-        self.metrics = {
-            'Total Trades': int(total_trades),
-            'Total Profit ($)': round(total_profit, 2),
-            'Profit Factor': round(profit_factor, 2),
-            'Win Rate (%)': round(win_rate, 2),
-            'Max Drawdown ($)': round(dd, 2),
-            'Avg Win ($)': round(avg_win, 2),
-            'Avg Loss ($)': round(avg_loss, 2),
-            'Risk/Reward Ratio': round(risk_reward_ratio, 2),
-            'Best Trade ($)': round(best_trade, 2),
-            'Worst Trade ($)': round(worst_trade, 2),
-            'Max Consec. Wins': int(cons_wins),
-            'Max Consec. Losses': int(cons_losses),
-            'Avg Duration': str(avg_duration).split('.')[0]
-        }
+        self.metrics = self.trades.metrics() if self.trades is not None else trade_metrics(pd.DataFrame())
         return self.metrics
     
     def print_summary(self):
-        print("\n" + "="*40)
-        print("📊 FULL STRATEGY REPORT")
-        print("="*40)
-        for k, v in self.metrics.items():
-            print(f"{k:<25}: {v}")
-        print("="*40 + "\n")
\ No newline at end of file
+        print_summary(self.metrics)
+
+
+def trade_metrics(trades):
+    """Metrics dict for any trade log (also used for stitched walk-forward logs)."""
+    if trades.empty:
+        return {'Total Trades': 0, 'Total Profit ($)': 0, 'Profit Factor': 0, 'Max Drawdown ($)': 0}
+    
+    block = batch_metrics(trades['pnl_usd'].values, trades['duration'].values,
+                          trades['exit_time'].values, [0, len(trades)])
+    return metrics_records(block)[0]
+
+def print_summary(metrics, title="📊 FULL STRATEGY REPORT"):
+    print("\n" + "="*40)
+    print(title)
+    print("="*40)
+    for k, v in metrics.items():
+        print(f"{k:<25}: {v}")
+    print("="*40 + "\n")
\ No newline at end of file
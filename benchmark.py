@@ -0,0 +1,206 @@
+# Pipeline benchmarks on deterministic synthetic data.
+#
+#   python benchmark.py                      default sizes, compared with benchmark_baseline.json
+#   python benchmark.py --sizes 1y_H1,10y_M1
+#   python benchmark.py --save               store the run as the new baseline
+#
+# Exits with status 1 when a stage got slower than baseline +THRESHOLD.
+# Baselines are machine-specific: save one per machine before comparing.
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from data_loader import DataLoad, TIMEFRAMES
+from indicators import Indicators
+from strategy import Strategy, DEFAULT_PARAMS
+from backtester import Backtester
+from optimizer import Optimizer
+from result_store import dataset_fingerprint
+from memory import MemoryTracker, peak_rss_mb
+
+# name -> (years, timeframe)
+SIZES = {
+    '1y_H1': (1, 'H1'),
+    '5y_H1': (5, 'H1'),
+    '1y_M5': (1, 'M5'),
+    '1y_M1': (1, 'M1'),
+    '10y_M1': (10, 'M1'),
+}
+DEFAULT_SIZES = ['1y_H1', '5y_H1', '1y_M1']
+BASELINE_FILE = "benchmark_baseline.json"
+THRESHOLD = 0.20        # allowed slowdown per stage (20%)
+MIN_DELTA = 0.05        # seconds; smaller differences are timer noise
+
+# Fixed grid for the end-to-end optimizer stage (288 combinations)
+BENCH_GRID = {
+    'sma_fast': [10, 20, 30, 40],
+    'sma_slow': [50, 100, 150],
+    'sma_trend': [200],
+    'bb_period': [20],
+    'bb_std': [2.0, 2.4],
+    'atr_period': [14],
+    'range_atr_filter': [0.8],
+    'sl_multiplier': [1.5, 2.5],
+    'tp_multiplier': [3.0, 5.0, 7.0],
+    'be_multiplier': [1.5, 100.0],
+}
+
+
+def synthetic_ohlc(years, timeframe, seed=7, start='2015-01-05'):
+    """
+    Deterministic FX-like bars in DataLoad's format: a random walk with
+    busier London/NY hours, weekends removed. Same seed -> same bars.
+    """
+    step = TIMEFRAMES[timeframe]
+    index = pd.date_range(start, periods=int(years * 365 * 86400 // step), freq=f"{step}s")
+    index = index[index.dayofweek < 5]
+    n = len(index)
+    rng = np.random.default_rng(seed)
+
+    sigma = 0.08 * np.sqrt(step / (260 * 86400))   # ~8% a year
+    hours = index.hour.values
+    vol = sigma * np.where((hours >= 7) & (hours < 17), 1.4, 0.7)
+    close = 1.10 * np.exp(np.cumsum(rng.standard_normal(n) * vol))
+    open_ = np.r_[1.10, close[:-1]]
+    wicks = np.abs(rng.standard_normal((2, n))) * vol * close * 0.5
+
+    df = pd.DataFrame({
+        'price': close.round(5),
+        'High': (np.maximum(open_, close) + wicks[0]).round(5),
+        'Low': (np.minimum(open_, close) - wicks[1]).round(5),
+    }, index=pd.DatetimeIndex(index, name='Datetime'))
+    return DataLoad.add_features(df)
+
+
+class BenchmarkOptimizer(Optimizer):
+    def get_monster_grid(self):
+        return BENCH_GRID
+
+
+def _best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+def bench_size(name, repeat=3):
+    """Seconds per pipeline stage, optimizer throughput and memory for one data size."""
+    years, timeframe = SIZES[name]
+    t0 = time.perf_counter()
+    df = synthetic_ohlc(years, timeframe)
+    result = {'bars': len(df), 'fingerprint': dataset_fingerprint(df),
+              'generate': round(time.perf_counter() - t0, 3)}
+    params = DEFAULT_PARAMS
+
+    strategy = Strategy(df, params)
+    strategy.calculate_all(params)
+    bot = Backtester(df, params)
+    bot.run_strategy()
+    stages = {
+        'indicators': lambda: Indicators(df).calculate_all(params),
+        'signals': strategy._generate_signals,
+        'trade_log': bot.generate_trade_log,
+        'metrics': bot.calculate_metrics,
+    }
+    memory = MemoryTracker()
+    for stage, fn in stages.items():
+        result[stage] = round(_best_time(fn, repeat), 4)
+        # Separate traced run: tracemalloc slows allocations down
+        with memory.stage(stage):
+            fn()
+    result['stage_peak_mb'] = {s['stage']: s['peak_mb'] for s in memory.stages}
+
+    opt = BenchmarkOptimizer(df)
+    combos = int(np.prod([len(v) for v in BENCH_GRID.values()]))
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        opt.optimize()
+    seconds = time.perf_counter() - t0
+    result['optimize'] = round(seconds, 3)
+    result['combos_per_sec'] = round(combos / seconds, 1)
+    result['worker_peak_mb'] = round(opt.worker_peak_mb, 1)
+    # Process high-water mark so far (sizes run in the order given)
+    result['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    return result
+
+
+TIMED_STAGES = ['indicators', 'signals', 'trade_log', 'metrics', 'optimize']
+
+def compare(results, baseline, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """Regression messages: stages slower than baseline * (1 + threshold)."""
+    problems = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if base.get('fingerprint') != current['fingerprint']:
+            problems.append(f"{name}: synthetic data differs from the baseline's, re-save the baseline")
+            continue
+        for stage in TIMED_STAGES:
+            old, new = base[stage], current[stage]
+            if new > old * (1 + threshold) and new - old > min_delta:
+                problems.append(f"{name} {stage}: {old:.3f}s -> {new:.3f}s (+{(new / old - 1) * 100:.0f}%)")
+    return problems
+
+def print_report(results, baseline):
+    print("\n" + "="*40)
+    print("⏱️ BENCHMARK")
+    print("="*40)
+    for name, r in results.items():
+        base = baseline.get(name, {})
+        print(f"{name} ({r['bars']:,} bars)")
+        for stage in TIMED_STAGES:
+            ref = f" (baseline {base[stage]:.3f}s)" if stage in base else ""
+            print(f"  {stage:<12}: {r[stage]:.3f}s{ref}")
+        ref = f" (baseline {base['combos_per_sec']})" if 'combos_per_sec' in base else ""
+        print(f"  {'throughput':<12}: {r['combos_per_sec']} combos/s{ref}")
+        print(f"  {'memory':<12}: peak RSS {r['peak_rss_mb']} MB, worker {r['worker_peak_mb']} MB, "
+              f"stage peaks {r['stage_peak_mb']}")
+    print("="*40 + "\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks on synthetic OHLC data.")
+    parser.add_argument('--sizes', default=",".join(DEFAULT_SIZES), help=f"comma list of {list(SIZES)}")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save', action='store_true', help="store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    for name in args.sizes.split(","):
+        print(f"--- Benchmarking {name} ---")
+        results[name] = bench_size(name, args.repeat)
+    print_report(results, baseline)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4)
+        print(f"✅ Saved baseline to '{args.baseline}'.")
+        return 0
+
+    if not baseline:
+        print(f"No baseline yet: run with --save to create '{args.baseline}'.")
+        return 0
+    problems = compare(results, baseline, args.threshold)
+    for p in problems:
+        print(f"❌ {p}")
+    if not problems:
+        print(f"✅ No stage slower than baseline +{args.threshold:.0%}.")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
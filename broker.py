@@ -0,0 +1,233 @@
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from instrumentation import INSTRUMENTS
+
+class OrderResult:
+    def __init__(self, ok, comment="", ticket=None, price=None):
+        self.ok = ok
+        self.comment = comment
+        self.ticket = ticket
+        self.price = price
+
+
+class Broker(ABC):
+    """
+    What the live loop needs from a broker.
+    rates() returns closed/forming bars like get_live_data always did:
+    Datetime index (server time) and price/High/Low/... columns,
+    position 0 being the forming bar.
+    """
+    @abstractmethod
+    def initialize(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def account_info(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def rates(self, symbol, timeframe_seconds, start_pos, count):
+        raise NotImplementedError
+
+    @abstractmethod
+    def tick(self, symbol):
+        raise NotImplementedError
+
+    @abstractmethod
+    def positions(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def market_order(self, symbol, signal, volume, price, sl, tp, magic, deviation, comment):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class MT5Broker(Broker):
+    """MetaTrader 5 terminal (Windows only). Terminal calls are timed as 'mt5_call'."""
+    def __init__(self):
+        import MetaTrader5 as mt5
+        self.mt5 = mt5
+        self.timeframes = {
+            60: mt5.TIMEFRAME_M1, 300: mt5.TIMEFRAME_M5, 900: mt5.TIMEFRAME_M15,
+            1800: mt5.TIMEFRAME_M30, 3600: mt5.TIMEFRAME_H1, 14400: mt5.TIMEFRAME_H4,
+            86400: mt5.TIMEFRAME_D1,
+        }
+
+    @INSTRUMENTS.timed('mt5_call', call='initialize')
+    def initialize(self):
+        return self.mt5.initialize()
+
+    @INSTRUMENTS.timed('mt5_call', call='account_info')
+    def account_info(self):
+        return self.mt5.account_info()
+
+    @INSTRUMENTS.timed('mt5_call', call='copy_rates_from_pos')
+    def rates(self, symbol, timeframe_seconds, start_pos, count):
+        rates = self.mt5.copy_rates_from_pos(symbol, self.timeframes[timeframe_seconds], start_pos, count)
+        if rates is None: return None
+        df = pd.DataFrame(rates)
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+        rename = {'time': 'Datetime', 'close': 'price', 'high': 'High', 'low': 'Low', 'open': 'Open', 'tick_volume': 'Volume'}
+        df.rename(columns=rename, inplace=True)
+        df.set_index('Datetime', inplace=True)
+        return df
+
+    @INSTRUMENTS.timed('mt5_call', call='symbol_info_tick')
+    def tick(self, symbol):
+        return self.mt5.symbol_info_tick(symbol)
+
+    @INSTRUMENTS.timed('mt5_call', call='positions_get')
+    def positions(self):
+        return self.mt5.positions_get() or []
+
+    @INSTRUMENTS.timed('mt5_call', call='order_send')
+    def market_order(self, symbol, signal, volume, price, sl, tp, magic, deviation, comment):
+        mt5 = self.mt5
+        request = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": symbol,
+            "volume": volume,
+            "type": mt5.ORDER_TYPE_BUY if signal == 1 else mt5.ORDER_TYPE_SELL,
+            "price": price,
+            "sl": sl,
+            "tp": tp,
+            "deviation": deviation,
+            "magic": magic,
+            "comment": comment,
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_IOC,
+        }
+        result = mt5.order_send(request)
+        if result is None:
+            return OrderResult(False, str(mt5.last_error()))
+        return OrderResult(result.retcode == mt5.TRADE_RETCODE_DONE, result.comment,
+                           getattr(result, 'order', None), getattr(result, 'price', price))
+
+    def shutdown(self):
+        self.mt5.shutdown()
+
+
+class ReplayBroker(Broker):
+    """
+    Offline broker that replays historical bars (DataLoad output, one frame
+    per symbol) and simulates fills and SL/TP on bar High/Low.
+
+    The replay clock sits at the close of the last revealed bar; advance()
+    reveals the next bar, checks open positions against it (SL before TP,
+    like the Backtester) and moves the clock.
+    Ticks are the last close, ask = bid + spread.
+    """
+    def __init__(self, frames, start_bar=500, spread=0.0, balance=10000.0, contract_size=100000):
+        self.timeline = pd.DatetimeIndex(sorted(set().union(*[df.index for df in frames.values()])))
+        self.frames = {}
+        for symbol, df in frames.items():
+            df = df.reindex(self.timeline).ffill()
+            self.frames[symbol] = {
+                'index': df.index,
+                'price': df['price'].to_numpy(dtype=np.float64),
+                'High': df['High'].to_numpy(dtype=np.float64),
+                'Low': df['Low'].to_numpy(dtype=np.float64),
+            }
+        steps = np.diff(self.timeline.values).astype('timedelta64[s]').astype(np.int64)
+        self.timeframe_seconds = int(np.median(steps)) if len(steps) else 3600
+
+        self.cursor = min(start_bar, len(self.timeline) - 1)   # forming bar
+        self.spread = spread
+        self.balance = balance
+        self.contract_size = contract_size
+        self.open_positions = []
+        self.closed_trades = []
+        self.next_ticket = 1
+        self.wall_at_close = time.time()
+
+    # --- Replay clock ---
+    @property
+    def finished(self):
+        return self.cursor >= len(self.timeline)
+
+    def server_time(self):
+        last_closed = self.timeline[self.cursor - 1]
+        return last_closed.timestamp() + self.timeframe_seconds
+
+    def advance(self):
+        """Closes the forming bar: simulates SL/TP on it and moves the clock."""
+        if self.finished:
+            return False
+        i = self.cursor
+        for pos in list(self.open_positions):
+            f = self.frames[pos.symbol]
+            high, low = f['High'][i], f['Low'][i]
+            exit_price = None
+            if pos.type == 1:
+                if low <= pos.sl: exit_price = pos.sl
+                elif high >= pos.tp: exit_price = pos.tp
+            else:
+                if high >= pos.sl: exit_price = pos.sl
+                elif low <= pos.tp: exit_price = pos.tp
+            if exit_price is not None:
+                self._close(pos, exit_price, self.timeline[i])
+        self.cursor += 1
+        self.wall_at_close = time.time()
+        return not self.finished
+
+    def _close(self, pos, exit_price, exit_time):
+        pnl = (exit_price - pos.price_open) * pos.type * pos.volume * self.contract_size
+        self.balance += pnl
+        self.open_positions.remove(pos)
+        self.closed_trades.append({
+            'symbol': pos.symbol, 'magic': pos.magic,
+            'trade_type': 'Long' if pos.type == 1 else 'Short',
+            'entry_time': pos.time, 'exit_time': exit_time,
+            'entry_price': pos.price_open, 'exit_price': exit_price,
+            'volume': pos.volume, 'pnl_usd': pnl,
+        })
+
+    # --- Broker API ---
+    def initialize(self):
+        return True
+
+    def account_info(self):
+        floating = 0.0
+        for pos in self.open_positions:
+            bid = self.frames[pos.symbol]['price'][self.cursor - 1]
+            floating += (bid - pos.price_open) * pos.type * pos.volume * self.contract_size
+        return SimpleNamespace(balance=self.balance, equity=self.balance + floating)
+
+    def rates(self, symbol, timeframe_seconds, start_pos, count):
+        f = self.frames.get(symbol)
+        if f is None:
+            return None
+        end = min(self.cursor - start_pos + 1, len(self.timeline))
+        start = max(0, end - count)
+        if end <= start:
+            return None
+        return pd.DataFrame({
+            'price': f['price'][start:end],
+            'High': f['High'][start:end],
+            'Low': f['Low'][start:end],
+        }, index=pd.DatetimeIndex(f['index'][start:end], name='Datetime'))
+
+    def tick(self, symbol):
+        f = self.frames.get(symbol)
+        if f is None:
+            return None
+        bid = f['price'][self.cursor - 1]
+        t = self.server_time()
+        return SimpleNamespace(bid=bid, ask=bid + self.spread, time=int(t), time_msc=int(t * 1000))
+
+    def positions(self):
+        return list(self.open_positions)
+
+    def market_order(self, symbol, signal, volume, price, sl, tp, magic, deviation, comment):
+        pos = SimpleNamespace(ticket=self.next_ticket, symbol=symbol, type=int(signal), volume=volume,
+                              price_open=price, sl=sl, tp=tp, magic=magic, comment=comment,
+                              time=self.timeline[self.cursor - 1])
+        self.next_ticket += 1
+        self.open_positions.append(pos)
+        return OrderResult(True, "replay fill", pos.ticket, price)
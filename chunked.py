@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+from strategy import Strategy, DEFAULT_PARAMS
+from exit_engine import ExitEngine, single_position_mask
+from trade_log import TradeLog, TRADE_DTYPE
+from backtester import trade_metrics, print_summary
+from instrumentation import INSTRUMENTS
+
+def frame_blocks(df, block_bars):
+    """An in-memory frame as consecutive blocks (same shape as DataLoad.iter_blocks)."""
+    for start in range(0, len(df), block_bars):
+        yield df.iloc[start:start + block_bars]
+
+
+class WindowLocalStrategy(Strategy):
+    """Strategy on window-local rolling kernels: indicator values do not depend on where a block starts."""
+    window_local = True
+
+
+class ChunkedBacktester:
+    """
+    Backtester.run_backtest() for histories that do not fit in memory.
+    Bars arrive in blocks (e.g. DataLoad(...).iter_blocks(500_000)); only
+    the current block and a short tail of the previous one are held.
+
+    Carried from block to block:
+      - the last warmup_bars() base bars, so every rolling window, the
+        50-bar ATR baseline and the previous-bar hook see the same bars as
+        in one big frame;
+      - open trades with their SL / TP levels and break-even state.
+
+    Indicators use window-local rolling kernels (WindowLocalStrategy), so
+    trades and metrics equal an in-memory run of WindowLocalStrategy bit
+    for bit, for any block size (also with single_position). Against the
+    regular pandas rolling they differ only in the last bits of the
+    indicator values.
+    Assumes gap-free bars (no NaN rows), as DataLoad produces.
+    """
+    def __init__(self, blocks, params=None, position_size=1000, single_position=False):
+        self.blocks = blocks
+        self.params = DEFAULT_PARAMS.copy()
+        if params:
+            self.params.update(params)
+        self.position_size = position_size
+        self.single_position = single_position
+        self.metrics = {}
+        self.trades = None
+        self._trade_frame = None
+        self.bars = 0           # signal bars seen (rows of the in-memory trimmed frame)
+        self.n_blocks = 0
+        self.max_open = 0
+
+    @property
+    def trade_log(self):
+        if self._trade_frame is None:
+            self._trade_frame = self.trades.to_frame() if self.trades is not None else pd.DataFrame()
+        return self._trade_frame
+
+    def warmup_bars(self):
+        p = self.params
+        longest = max(int(p['sma_fast']), int(p['sma_slow']), int(p['sma_trend']),
+                      int(p['bb_period']), int(p['atr_period']), 50)
+        # Longest window (+ previous close for TR), then 50 trimmed bars of ATR baseline
+        return longest + 50
+
+    def run_backtest(self):
+        warmup = self.warmup_bars()
+        tail = None
+        carried = None
+        closed = []
+
+        for block in self.blocks:
+            if not len(block):
+                continue
+            frame = block if tail is None else pd.concat([tail, block])
+            tail = frame.iloc[-warmup:].copy()
+
+            strategy = WindowLocalStrategy(frame, self.params)
+            strategy.run_strategy()
+            data = strategy.data
+            data = data.iloc[np.searchsorted(data.index.values, block.index.values[0]):]
+            if not len(data):
+                continue
+
+            carried, done = self._run_block(data, carried)
+            closed.append(done)
+            self.bars += len(data)
+            self.n_blocks += 1
+            self.max_open = max(self.max_open, len(carried['entry_idx']))
+
+        self._set_trades(self._trade_log(closed))
+        return self.calculate_metrics()
+
+    # --- Per block ---
+    @INSTRUMENTS.timed('exits')
+    def _run_block(self, data, carried):
+        """Resolves carried trades and the block's new entries; returns (still open, closed)."""
+        atr_col = f"ATR_{int(self.params['atr_period'])}"
+        positions = data['position'].values
+        datetimes = data.index.values
+        engine = ExitEngine(data['High'].values, data['Low'].values)
+
+        local = np.where(positions != 0)[0]
+        is_long, sl, tp, be_trigger = ExitEngine.exit_levels(
+            positions[local], data['price'].values[local], data[atr_col].values[local],
+            self.params['sl_multiplier'], self.params['tp_multiplier'], self.params.get('be_multiplier', 100))
+        new = {'entry_idx': self.bars + local, 'entry_time': datetimes[local], 'is_long': is_long,
+               'entry_price': np.asarray(data['price'].values[local], dtype=np.float64),
+               'sl': sl, 'tp': tp, 'be_trigger': be_trigger}
+        if carried is None:
+            carried = {k: v[:0] for k, v in new.items()}
+        trades = {k: np.concatenate([carried[k], new[k]]) for k in new}
+        # Carried trades scan from the first bar, new ones from the bar after entry
+        start = np.concatenate([np.zeros(len(carried['entry_idx']), dtype=np.int64), local + 1])
+
+        exit_idx, exit_price, be_armed = engine.resolve(
+            start, trades['is_long'], trades['entry_price'], trades['sl'], trades['tp'], trades['be_trigger'])
+
+        if self.single_position:
+            # A carried trade sits before the block's first bar
+            at = np.concatenate([np.full(len(carried['entry_idx']), -1, dtype=np.int64), local])
+            keep = single_position_mask(at, exit_idx)
+            trades = {k: v[keep] for k, v in trades.items()}
+            exit_idx, exit_price, be_armed = exit_idx[keep], exit_price[keep], be_armed[keep]
+
+        done = exit_idx != -1
+        closed = {k: v[done] for k, v in trades.items()}
+        closed['exit_idx'] = self.bars + exit_idx[done]
+        closed['exit_time'] = datetimes[exit_idx[done]]
+        closed['exit_price'] = exit_price[done]
+
+        still_open = {k: v[~done] for k, v in trades.items()}
+        # Break-even armed in this block: the stop sits at entry from now on
+        armed = be_armed[~done]
+        still_open['sl'] = np.where(armed, still_open['entry_price'], still_open['sl'])
+        still_open['be_trigger'] = np.where(armed, np.where(still_open['is_long'], np.inf, -np.inf),
+                                            still_open['be_trigger'])
+        return still_open, closed
+
+    def _trade_log(self, closed):
+        """Closed trades in entry order, indexed into a datetimes array of just their bars."""
+        if not closed:
+            return TradeLog(np.empty(0, dtype=TRADE_DTYPE), np.empty(0, dtype='M8[ns]'))
+        trades = {k: np.concatenate([c[k] for c in closed]) for k in closed[0]}
+        order = np.argsort(trades['entry_idx'], kind='stable')
+        trades = {k: v[order] for k, v in trades.items()}
+
+        n = len(order)
+        bars, positions = np.unique(np.concatenate([trades['entry_idx'], trades['exit_idx']]), return_inverse=True)
+        datetimes = np.empty(len(bars), dtype=trades['entry_time'].dtype)
+        datetimes[positions] = np.concatenate([trades['entry_time'], trades['exit_time']])
+
+        sides = np.where(trades['is_long'], 1, -1).astype(np.int8)
+        entries = (positions[:n], sides, trades['entry_price'], None)
+        return TradeLog.from_exits(entries, positions[n:], trades['exit_price'], datetimes, self.position_size)
+
+    # --- Results ---
+    def _set_trades(self, trades):
+        self.trades = trades
+        self._trade_frame = None
+
+    def calculate_metrics(self):
+        self.metrics = self.trades.metrics() if self.trades is not None else trade_metrics(pd.DataFrame())
+        return self.metrics
+
+    def print_summary(self):
+        print_summary(self.metrics, title=f"📊 CHUNKED REPORT ({self.bars:,} bars, {self.n_blocks} blocks)")
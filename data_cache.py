@@ -0,0 +1,264 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1
+SESSIONS = ['asia', 'london', 'ny', 'deadzone']
+FLOAT_COLS = ['price', 'High', 'Low', 'returns']
+BOMS = {b'\xff\xfe': 'utf-16-le', b'\xfe\xff': 'utf-16-be'}
+
+class DataCache:
+    """
+    Binary columnar cache for DataLoad.process_data.
+
+    Each column is a raw little-endian file (float64 prices, int64 timestamps,
+    int8 session codes) that is memory-mapped on load. The cache is keyed by
+    the CSV's hash and mtime; when the CSV only gained rows at the end, just
+    the new tail is parsed and appended.
+
+    status after load(): 'hit', 'append' or 'rebuild'.
+    """
+    def __init__(self, file_path, loader, cache_dir=None):
+        self.file_path = file_path
+        self.loader = loader
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), '.cache')
+        self.path = os.path.join(cache_dir, os.path.basename(file_path) + '.cols')
+        self.meta_path = os.path.join(self.path, 'meta.json')
+        self.status = None
+
+    # --- Public ---
+    def load(self):
+        return self._load_columns(self._fresh_meta())
+
+    def iter_blocks(self, block_bars):
+        """
+        Yields the cached frame in consecutive blocks of block_bars rows.
+        Only the current block is read from the column files, so the
+        whole history never has to fit in memory.
+        """
+        meta = self._fresh_meta()
+        n = meta['length']
+        columns = {col: self._column(meta, col, dtype) for col, dtype in self._column_specs()}
+        for start in range(0, n, block_bars):
+            stop = min(n, start + block_bars)
+            data = {col: np.array(columns[col][start:stop]) for col in FLOAT_COLS}
+            data['session'] = pd.Categorical.from_codes(np.array(columns['session'][start:stop]), categories=SESSIONS)
+            index = pd.DatetimeIndex(np.array(columns['__index__'][start:stop]).view(meta['index_dtype']), name='Datetime')
+            yield pd.DataFrame(data, index=index, copy=False)
+
+    def derived(self, name, build):
+        """
+        A frame computed from the cached one (e.g. resampled bars), kept as
+        its own column set next to it. build(base) runs only when the base
+        data changed since the derived columns were written.
+        """
+        meta = self._fresh_meta()
+        path = f"{self.path}.{name}"
+        derived_meta = self._read_meta(os.path.join(path, 'meta.json'))
+        if derived_meta and derived_meta['base_hash'] == meta['hash']:
+            return self._load_columns(derived_meta, path)
+
+        data = build(self._load_columns(meta))
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        self._write_columns(tmp_path, data, mode='wb')
+        derived_meta = {
+            'version': CACHE_VERSION,
+            'base_hash': meta['hash'],
+            'length': len(data),
+            'index_dtype': str(data.index.dtype),
+        }
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(derived_meta, f, indent=4)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return self._load_columns(derived_meta, path)
+
+    def _fresh_meta(self):
+        """Brings the column files up to date with the CSV; returns their meta."""
+        stat = os.stat(self.file_path)
+        meta = self._read_meta()
+
+        if meta and meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+            self.status = 'hit'
+            return meta
+
+        grew = meta is not None and stat.st_size > meta['size']
+        full_hash, prefix_hash = self._hash_file(meta['size'] if grew else None)
+
+        if meta and full_hash == meta['hash']:
+            # Touched but unchanged
+            meta['mtime_ns'] = stat.st_mtime_ns
+            self._write_meta(meta)
+            self.status = 'hit'
+            return meta
+
+        if grew and prefix_hash == meta['hash']:
+            if self._append(meta, stat, full_hash):
+                self.status = 'append'
+                return meta
+
+        self._rebuild(stat, full_hash)
+        self.status = 'rebuild'
+        return self._read_meta()
+
+    # --- Build / Append ---
+    def _rebuild(self, stat, full_hash):
+        raw, fmt = self.loader.read_csv()
+        df = self.loader.normalize(raw)
+        last_price = float(df['price'].iloc[-1]) if len(df) else None
+        data = self.loader.add_features(df)
+
+        with open(self.file_path, 'rb') as f:
+            head = f.read(65536)
+        bom = head[:2] if head[:2] in BOMS else b''
+        fmt['bom'] = bom.hex()
+
+        tmp_path = self.path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        self._write_columns(tmp_path, data, mode='wb')
+
+        meta = {
+            'version': CACHE_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': full_hash,
+            'format': fmt,
+            'header': self._decode(head[len(bom):], fmt, errors='ignore').split('\n', 1)[0].rstrip('\r'),
+            'length': len(data),
+            'index_dtype': str(data.index.dtype),
+            'last_index': int(data.index.values[-1].view('i8')) if len(data) else None,
+            'last_price': last_price,
+        }
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=4)
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(tmp_path, self.path)
+
+    def _append(self, meta, stat, full_hash):
+        """Parses only the bytes added since the cached version. False -> rebuild."""
+        fmt = meta['format']
+        if meta['last_index'] is None or meta['size'] < 2:
+            return False
+        with open(self.file_path, 'rb') as f:
+            f.seek(meta['size'] - 2)
+            boundary = f.read(2)
+            tail = f.read()
+
+        # The cached file must have ended on a complete line
+        if not boundary.endswith(b'\n') and boundary != '\n'.encode('utf-16-le'):
+            return False
+
+        try:
+            text = meta['header'] + '\n' + self._decode(tail, fmt)
+            raw = pd.read_csv(io.StringIO(text), sep=fmt['sep'])
+            df = self.loader.normalize(raw)
+        except Exception:
+            return False
+
+        if len(df) == 0:
+            return False
+        # Rows that would interleave with (or duplicate) cached rows need a full sort
+        if str(df.index.dtype) != meta['index_dtype'] or int(df.index.values[0].view('i8')) <= meta['last_index']:
+            return False
+
+        last_price = float(df['price'].iloc[-1])
+        data = self.loader.add_features(df, prev_price=meta['last_price'])
+
+        self._truncate_columns(meta)
+        self._write_columns(self.path, data, mode='ab')
+
+        meta.update({
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': full_hash,
+            'length': meta['length'] + len(data),
+            'last_index': int(df.index.values[-1].view('i8')),
+            'last_price': last_price,
+        })
+        self._write_meta(meta)
+        return True
+
+    # --- Column files ---
+    @staticmethod
+    def _column_specs():
+        specs = [(col, '<f8') for col in FLOAT_COLS]
+        specs.append(('session', 'i1'))
+        specs.append(('__index__', '<i8'))
+        return specs
+
+    def _write_columns(self, path, data, mode):
+        arrays = {col: data[col].to_numpy(dtype=np.float64) for col in FLOAT_COLS}
+        arrays['session'] = pd.Categorical(data['session'], categories=SESSIONS).codes.astype(np.int8)
+        arrays['__index__'] = data.index.values.view('i8')
+
+        for col, dtype in self._column_specs():
+            with open(os.path.join(path, f"{col}.bin"), mode) as f:
+                f.write(np.ascontiguousarray(arrays[col], dtype=dtype).tobytes())
+
+    def _truncate_columns(self, meta):
+        # Drop anything a previously interrupted append left past 'length'
+        for col, dtype in self._column_specs():
+            with open(os.path.join(self.path, f"{col}.bin"), 'r+b') as f:
+                f.truncate(meta['length'] * np.dtype(dtype).itemsize)
+
+    def _column(self, meta, col, dtype, path=None):
+        n = meta['length']
+        if n == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(path or self.path, f"{col}.bin"), dtype=dtype, mode='r', shape=(n,))
+
+    def _load_columns(self, meta, path=None):
+        data = {col: self._column(meta, col, '<f8', path) for col in FLOAT_COLS}
+        data['session'] = pd.Categorical.from_codes(self._column(meta, 'session', 'i1', path), categories=SESSIONS)
+        index = pd.DatetimeIndex(self._column(meta, '__index__', '<i8', path).view(meta['index_dtype']), name='Datetime')
+        return pd.DataFrame(data, index=index, copy=False)
+
+    # --- Helpers ---
+    def _read_meta(self, path=None):
+        try:
+            with open(path or self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('version') == CACHE_VERSION else None
+
+    def _write_meta(self, meta):
+        tmp = self.meta_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp, self.meta_path)
+
+    def _hash_file(self, prefix_size=None):
+        """Returns (hash of whole file, hash of the first prefix_size bytes)."""
+        h = hashlib.blake2b(digest_size=20)
+        prefix_hash = None
+        read = 0
+        with open(self.file_path, 'rb') as f:
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    break
+                if prefix_size is not None and prefix_hash is None and read + len(chunk) >= prefix_size:
+                    cut = prefix_size - read
+                    h.update(chunk[:cut])
+                    prefix_hash = h.hexdigest()
+                    h.update(chunk[cut:])
+                else:
+                    h.update(chunk)
+                read += len(chunk)
+        return h.hexdigest(), prefix_hash
+
+    @staticmethod
+    def _decode(raw, fmt, errors='strict'):
+        if fmt['encoding'] == 'utf-16':
+            return raw.decode(BOMS.get(bytes.fromhex(fmt.get('bom', '')), 'utf-16-le'), errors)
+        return raw.decode('utf-8', errors)
@@ -1,15 +1,32 @@
 import pandas as pd
 import numpy as np
 import os
+from data_cache import DataCache
+from instrumentation import INSTRUMENTS
+
+# Bar length in seconds per timeframe name (MT5 naming)
+TIMEFRAMES = {'M1': 60, 'M5': 300, 'M15': 900, 'M30': 1800, 'H1': 3600, 'H4': 14400, 'D1': 86400}
 
 class DataLoad:
     """
     Handles data loading, cleaning, and feature engineering (Sessions, Returns).
+    Processed frames are cached in a binary columnar store next to the CSV
+    (see DataCache); pass use_cache=False to always re-parse.
+    low_memory: float32 prices/returns and a categorical session column;
+    indicators and exit tables then follow the float32 data.
+    resample('H4') etc. derive coarser bars from the loaded ones, so only
+    the finest export is needed.
     """
-    def __init__(self, file_path):
+    def __init__(self, file_path, use_cache=True, cache_dir=None, low_memory=False):
         self.file_path = file_path
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.low_memory = low_memory
+        self.cache_status = 'disabled'
         self.data = None
+        self.frames = {}
 
+    @INSTRUMENTS.timed('data_load')
     def process_data(self):
         """
         Loads data, cleans columns, sets index, calculates returns,
@@ -18,14 +35,118 @@ class DataLoad:
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"File not found: {self.file_path}")
 
-        # 1. Load File (Handle formats)
+        if self.use_cache:
+            cache = DataCache(self.file_path, self, self.cache_dir)
+            self.data = cache.load()
+            self.cache_status = cache.status
+        else:
+            raw, _ = self.read_csv()
+            self.data = self.add_features(self.normalize(raw))
+
+        if self.low_memory:
+            self.data = self.compact(self.data)
+        self.frames = {}
+        return self.data
+
+    def base_timeframe(self):
+        """Name of the loaded bars' timeframe (median bar spacing), None if non-standard."""
+        if self.data is None:
+            self.process_data()
+        steps = np.diff(self.data.index.values[:1000]).astype('m8[s]').astype(np.int64)
+        seconds = int(np.median(steps)) if len(steps) else None
+        return next((name for name, s in TIMEFRAMES.items() if s == seconds), None)
+
+    def resample(self, timeframe):
+        """
+        The data as `timeframe` bars ('M30', 'H4', 'D1', ...).
+        Frames are kept per timeframe; with the cache on they are also
+        stored next to the base columns and rebuilt when the CSV changes.
+        """
+        if self.data is None:
+            self.process_data()
+        base = self.base_timeframe()
+        if timeframe == base:
+            return self.data
+        if timeframe in self.frames:
+            return self.frames[timeframe]
+        if timeframe not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe '{timeframe}' (use one of {list(TIMEFRAMES)})")
+        if base is not None and TIMEFRAMES[timeframe] < TIMEFRAMES[base]:
+            raise ValueError(f"Cannot build {timeframe} bars from {base} data")
+
+        if self.use_cache:
+            cache = DataCache(self.file_path, self, self.cache_dir)
+            frame = cache.derived(timeframe, lambda df: self.resample_bars(df, timeframe))
+        else:
+            frame = self.resample_bars(self.data, timeframe)
+        if self.low_memory:
+            frame = self.compact(frame)
+        self.frames[timeframe] = frame
+        return frame
+
+    @staticmethod
+    def resample_bars(df, timeframe):
+        """
+        Vectorized OHLC resampling: close = last, High = max, Low = min.
+        A bar takes the session of its last source bar (the one it closes
+        in, i.e. when its signal fires); returns are recomputed.
+        """
+        bars = df[['price', 'High', 'Low', 'session']].resample(
+            f"{TIMEFRAMES[timeframe]}s", label='left', closed='left').agg(
+            {'price': 'last', 'High': 'max', 'Low': 'min', 'session': 'last'})
+        # Periods without bars (weekends, holidays) come back empty
+        bars = bars.dropna(subset=['price'])
+        bars['session'] = np.asarray(bars['session'], dtype=object)
+        bars['returns'] = np.log(bars['price'] / bars['price'].shift(1))
+        bars.index.name = df.index.name
+        return bars[['price', 'High', 'Low', 'returns', 'session']].dropna().copy()
+
+    def iter_blocks(self, block_bars=500_000):
+        """
+        The processed frame in consecutive blocks of block_bars rows
+        (for ChunkedBacktester). With the cache on, blocks are read
+        straight from its column files instead of one full frame.
+        """
+        if not os.path.exists(self.file_path):
+            raise FileNotFoundError(f"File not found: {self.file_path}")
+
+        if not self.use_cache:
+            df = self.process_data()
+            for start in range(0, len(df), block_bars):
+                yield df.iloc[start:start + block_bars]
+            return
+
+        cache = DataCache(self.file_path, self, self.cache_dir)
+        for block in cache.iter_blocks(block_bars):
+            self.cache_status = cache.status
+            yield self.compact(block) if self.low_memory else block
+
+    @staticmethod
+    def compact(df):
+        """float32 price columns and categorical sessions (about half the memory)."""
+        cols = {col: df[col].to_numpy(dtype=np.float32) for col in ['price', 'High', 'Low', 'returns']}
+        cols['session'] = df['session'].astype('category')
+        return pd.DataFrame(cols, index=df.index, copy=False)
+
+    def read_csv(self):
+        """
+        1. Load File (Handle formats).
+        Returns the raw frame and the format that parsed it.
+        """
         try:
             df = pd.read_csv(self.file_path)
+            fmt = {'sep': ',', 'encoding': None}
             if len(df.columns) < 2:
                 df = pd.read_csv(self.file_path, sep='\t', encoding='utf-16')
+                fmt = {'sep': '\t', 'encoding': 'utf-16'}
         except:
             df = pd.read_csv(self.file_path, sep='\t')
+            fmt = {'sep': '\t', 'encoding': None}
+        return df, fmt
 
+    @staticmethod
+    def normalize(df):
+        """Steps 2-4: clean column names and build a sorted, unique Datetime index."""
         # 2. Clean Column Names
         df.columns = df.columns.str.strip().str.replace('<', '').str.replace('>', '').str.lower()
         
@@ -54,9 +175,18 @@ class DataLoad:
         df.sort_index(inplace=True)
 
         df = df[~df.index.duplicated(keep='first')]
-        
+        return df
+
+    @staticmethod
+    def add_features(df, prev_price=None):
+        """
+        Steps 5-7: returns, sessions and final cleanup.
+        prev_price is the raw close preceding df (used when appending rows).
+        """
         # 5. Calculate Returns
         df['returns'] = np.log(df['price'] / df['price'].shift(1))
+        if prev_price is not None and len(df):
+            df.iloc[0, df.columns.get_loc('returns')] = np.log(df['price'].iloc[0] / prev_price)
         
         # 6. --- Define Sessions (Added Back) ---
         # We use vectorization (np.select) for speed instead of loops
@@ -76,6 +206,4 @@ class DataLoad:
 
         # 7. Final Cleanup
         required_cols = ['price', 'High', 'Low', 'returns', 'session']
-        self.data = df[required_cols].dropna().copy()
-        
-        return self.data
\ No newline at end of file
+        return df[required_cols].dropna().copy()
@@ -0,0 +1,282 @@
+# Distributed optimization over a filesystem work queue.
+#
+#   coordinator:  Optimizer(df, backend=FileQueueBackend("/mnt/share/algo_queue"))
+#   each worker:  python distributed.py worker /mnt/share/algo_queue [--processes 4]
+#
+# The queue directory is all the coordination there is: a local folder for
+# several processes on one machine, or a share (NFS/SMB) that every host
+# mounts at the same path. No broker or server process is needed.
+# Host clocks need not agree: workers only touch their lease files and the
+# coordinator times leases on its own clock (see FileQueueBackend._gather).
+import argparse
+import json
+import os
+import pickle
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import ExitStack
+from shared_data import SharedDataset
+
+QUEUE_DIR = "work_queue"
+LEASE_SECONDS = 60      # a unit whose worker has not heartbeaten for this long is re-dispatched
+MAX_ATTEMPTS = 3        # dispatches per unit before the run fails
+POLL_SECONDS = 0.2
+
+def _write_pickle(path, obj):
+    # Written under a temporary name, then renamed: readers never see half a file
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def _read_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class FileQueueBackend:
+    """
+    Runs Optimizer chunks on worker processes that poll a queue directory.
+
+    Every run gets its own folder under `root`:
+        run.json           lease settings for the workers
+        algo_*/            the published datasets (SharedDataset, memory-mapped by workers)
+        todo/<unit>        pending work units
+        leased/<unit>.<w>  units being run by worker w; each change of the file's mtime is a heartbeat
+        done/<unit>        results (block, stats) or an error report
+        closed             written when the run is over; workers move on
+
+    A worker claims a unit by renaming it from todo/ to leased/ (atomic, so
+    one worker wins). Units whose lease expires (worker killed, host gone)
+    or that failed go back to todo/ until MAX_ATTEMPTS. A lease expires when
+    its mtime has not changed for lease_seconds of the coordinator's own
+    (monotonic) clock; the mtime value itself is never compared with the
+    coordinator's time, so clock skew between hosts does not matter. Results are yielded
+    as they land in done/; a late duplicate of a re-dispatched unit is
+    ignored.
+
+    local_workers: worker processes to start on this machine for the run
+    (0 = rely on workers started elsewhere).
+    """
+    def __init__(self, root=QUEUE_DIR, local_workers=0, lease_seconds=LEASE_SECONDS,
+                 max_attempts=MAX_ATTEMPTS, poll=POLL_SECONDS):
+        self.root = os.path.abspath(root)
+        self.local_workers = local_workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll = poll
+        self.stats = {}
+
+    def run(self, frames, tasks, prune=None, single_position=False):
+        """
+        frames: {timeframe: DataFrame}; tasks: [(timeframe, chunk of signal groups)].
+        Yields (task index, (block, stats)) in completion order.
+        """
+        run_dir = os.path.join(self.root, f"run_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}")
+        for sub in ('todo', 'leased', 'done'):
+            os.makedirs(os.path.join(run_dir, sub))
+        procs = []
+        try:
+            with ExitStack() as stack:
+                handles = {tf: stack.enter_context(SharedDataset(df, directory=run_dir)).handle
+                           for tf, df in frames.items()}
+                for i, (tf, chunk) in enumerate(tasks):
+                    _write_pickle(self._unit(run_dir, 'todo', i), {
+                        'handle': handles[tf], 'groups': chunk, 'prune': prune,
+                        'single_position': single_position})
+                with open(os.path.join(run_dir, 'run.json'), 'w') as f:
+                    json.dump({'lease_seconds': self.lease_seconds, 'tasks': len(tasks)}, f)
+
+                procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker', self.root,
+                                           '--run', os.path.basename(run_dir)])
+                         for _ in range(self.local_workers)]
+                yield from self._gather(run_dir, len(tasks))
+        finally:
+            open(os.path.join(run_dir, 'closed'), 'w').close()
+            for p in procs:
+                try:
+                    p.wait(timeout=self.lease_seconds)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    @staticmethod
+    def _unit(run_dir, state, i):
+        return os.path.join(run_dir, state, f"{i:06d}")
+
+    def _gather(self, run_dir, n_tasks):
+        attempts = [1] * n_tasks
+        received = set()
+        beats = {}      # leased name -> (last mtime seen, coordinator time it was first seen)
+        self.stats = {'redispatched': 0, 'errors': 0, 'workers': set()}
+        done_dir = os.path.join(run_dir, 'done')
+        leased_dir = os.path.join(run_dir, 'leased')
+
+        while len(received) < n_tasks:
+            arrived = False
+            for name in sorted(os.listdir(done_dir)):
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(done_dir, name)
+                i = int(name)
+                result = _read_pickle(path)
+                os.remove(path)
+                if i in received:
+                    continue
+                if result['error'] is not None:
+                    self.stats['errors'] += 1
+                    print(f"\n⚠️ Unit {i} failed on {result['worker']}:\n{result['error']}")
+                    self._redispatch(run_dir, i, attempts, result['payload'])
+                    continue
+                received.add(i)
+                self.stats['workers'].add(result['worker'])
+                arrived = True
+                yield i, result['output']
+
+            # Expired leases: the worker stopped heartbeating
+            now = time.monotonic()
+            names = os.listdir(leased_dir)
+            for name in set(beats) - set(names):
+                del beats[name]
+            for name in names:
+                path = os.path.join(leased_dir, name)
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                if name not in beats or beats[name][0] != mtime:
+                    beats[name] = (mtime, now)
+                    continue
+                i = int(name.split('.')[0])
+                if now - beats[name][1] > self.lease_seconds and i not in received:
+                    try:
+                        payload = _read_pickle(path)
+                        os.remove(path)
+                    except (FileNotFoundError, EOFError):
+                        continue  # finished or reclaimed meanwhile
+                    del beats[name]
+                    print(f"\n⚠️ Unit {i}: lease of {name.split('.', 1)[1]} expired, re-dispatching.")
+                    self._redispatch(run_dir, i, attempts, payload)
+            if not arrived:
+                time.sleep(self.poll)
+
+    def _redispatch(self, run_dir, i, attempts, payload):
+        if attempts[i] >= self.max_attempts:
+            raise RuntimeError(f"Work unit {i} failed {attempts[i]} times, giving up")
+        attempts[i] += 1
+        self.stats['redispatched'] += 1
+        _write_pickle(self._unit(run_dir, 'todo', i), payload)
+
+
+# --- Worker side ---
+def _claim(run_dir, worker):
+    todo = os.path.join(run_dir, 'todo')
+    for name in sorted(os.listdir(todo)):
+        if name.endswith('.tmp'):
+            continue
+        path = os.path.join(todo, name)
+        leased = os.path.join(run_dir, 'leased', f"{name}.{worker}")
+        try:
+            # Touched first: the rename keeps the mtime, and the lease must start fresh
+            os.utime(path)
+            os.rename(path, leased)
+        except FileNotFoundError:
+            continue  # another worker was faster
+        return name, leased
+    return None, None
+
+def _heartbeat(path, interval, stop):
+    while not stop.wait(interval):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return  # re-dispatched: the result is still delivered if it comes first
+
+def run_unit(payload):
+    from optimizer import run_group_chunk_shared
+    return run_group_chunk_shared(payload['handle'], payload['groups'], prune=payload['prune'],
+                                  single_position=payload['single_position'])
+
+def _open_runs(root, only=None):
+    if not os.path.isdir(root):
+        return []
+    runs = [only] if only else sorted(os.listdir(root))
+    return [os.path.join(root, r) for r in runs
+            if os.path.exists(os.path.join(root, r, 'run.json'))
+            and not os.path.exists(os.path.join(root, r, 'closed'))]
+
+def run_worker(root=QUEUE_DIR, run=None, idle_exit=None, poll=POLL_SECONDS):
+    """
+    Claims and runs units until stopped. With `run`, serves that run only
+    and exits when it is closed; otherwise serves every open run under
+    root and exits after idle_exit seconds without work (None = never).
+    """
+    root = os.path.abspath(root)
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    idle_since = time.time()
+    while True:
+        runs = _open_runs(root, run)
+        if run and not runs and os.path.exists(os.path.join(root, run, 'closed')):
+            return
+        for run_dir in runs:
+            name, leased = _claim(run_dir, worker)
+            if name is None:
+                continue
+            with open(os.path.join(run_dir, 'run.json')) as f:
+                lease = json.load(f)['lease_seconds']
+            try:
+                payload = _read_pickle(leased)
+            except FileNotFoundError:
+                continue  # lease already expired and the unit went back to todo/
+            stop = threading.Event()
+            threading.Thread(target=_heartbeat, args=(leased, lease / 4, stop), daemon=True).start()
+            try:
+                result = {'output': run_unit(payload), 'error': None}
+            except Exception:
+                result = {'output': None, 'error': traceback.format_exc(), 'payload': payload}
+            finally:
+                stop.set()
+            result['worker'] = worker
+            try:
+                _write_pickle(os.path.join(run_dir, 'done', name), result)
+                os.remove(leased)
+            except FileNotFoundError:
+                pass  # run closed meanwhile, or the lease was reclaimed
+            idle_since = time.time()
+            break
+        else:
+            if run and not os.path.isdir(os.path.join(root, run)):
+                return
+            if idle_exit is not None and time.time() - idle_since > idle_exit:
+                return
+            time.sleep(poll)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed optimization worker (filesystem queue).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    w = sub.add_parser("worker", help="run work units from a queue directory")
+    w.add_argument("root", nargs="?", default=QUEUE_DIR)
+    w.add_argument("--processes", type=int, default=1, help="worker processes on this host")
+    w.add_argument("--run", default=None, help="serve one run only (used by local_workers)")
+    w.add_argument("--idle-exit", type=float, default=None, help="exit after this many idle seconds")
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        cmd = [sys.executable, os.path.abspath(__file__), "worker", args.root]
+        if args.run:
+            cmd += ["--run", args.run]
+        if args.idle_exit is not None:
+            cmd += ["--idle-exit", str(args.idle_exit)]
+        procs = [subprocess.Popen(cmd) for _ in range(args.processes)]
+        sys.exit(max(p.wait() for p in procs))
+    try:
+        run_worker(args.root, args.run, args.idle_exit)
+    except KeyboardInterrupt:
+        pass
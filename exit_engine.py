@@ -0,0 +1,185 @@
+import numpy as np
+
+
+class ExitEngine:
+    """
+    Finds first-touch SL / TP / Break-Even bars for many entries at once.
+    Uses sparse tables (range max of Highs, range min of Lows) so every
+    search is O(log N) and all entries are resolved together with NumPy.
+    float32 bars (low-memory mode) keep float32 tables, half the size.
+    """
+    def __init__(self, highs, lows):
+        dtype = np.float32 if np.asarray(highs).dtype == np.float32 else np.float64
+        self.highs = np.asarray(highs, dtype=dtype)
+        self.lows = np.asarray(lows, dtype=dtype)
+        self.n = len(self.highs)
+        self.max_table = self._build_table(self.highs, np.maximum)
+        self.min_table = self._build_table(self.lows, np.minimum)
+
+    @staticmethod
+    def _build_table(values, op):
+        # table[k][i] = op(values[i : i + 2**k])
+        table = [values]
+        span = 1
+        while span * 2 <= len(values):
+            prev = table[-1]
+            table.append(op(prev[:-span], prev[span:]))
+            span *= 2
+        return table
+
+    def first_high_at_or_above(self, start, level):
+        """First index >= start where High >= level (n if never)."""
+        return self._first_touch(self.max_table, start, level, above=True)
+
+    def first_low_at_or_below(self, start, level):
+        """First index >= start where Low <= level (n if never)."""
+        return self._first_touch(self.min_table, start, level, above=False)
+
+    def _touch(self, start, level, upward):
+        # upward -> touched by High >= level, otherwise by Low <= level
+        hit = np.empty(len(start), dtype=np.int64)
+        hit[upward] = self.first_high_at_or_above(start[upward], level[upward])
+        hit[~upward] = self.first_low_at_or_below(start[~upward], level[~upward])
+        return hit
+
+    def _first_touch(self, table, start, level, above):
+        # Greedy descent: skip every 2**k block that cannot contain a touch.
+        pos = np.asarray(start, dtype=np.int64).copy()
+        level = np.asarray(level, dtype=np.float64)
+        for k in range(len(table) - 1, -1, -1):
+            span = 1 << k
+            row = table[k]
+            can_jump = pos + span <= self.n
+            if not can_jump.any():
+                continue
+            vals = row[np.minimum(pos, len(row) - 1)]
+            no_touch = (vals < level) if above else (vals > level)
+            pos = np.where(can_jump & no_touch, pos + span, pos)
+        return pos
+
+    @staticmethod
+    def exit_levels(entry_types, entry_prices, atrs, sl_mult, tp_mult, be_mult):
+        """(is_long, sl, tp, be_trigger) price levels of every entry."""
+        entry_prices = np.asarray(entry_prices, dtype=np.float64)
+        atrs = np.asarray(atrs, dtype=np.float64)
+        is_long = np.asarray(entry_types) == 1
+
+        sl = np.where(is_long, entry_prices - (atrs * sl_mult), entry_prices + (atrs * sl_mult))
+        tp = np.where(is_long, entry_prices + (atrs * tp_mult), entry_prices - (atrs * tp_mult))
+        be_trigger = np.where(is_long, entry_prices + (atrs * be_mult), entry_prices - (atrs * be_mult))
+        return is_long, sl, tp, be_trigger
+
+    def find_exits(self, entry_idx, entry_types, entry_prices, atrs, sl_mult, tp_mult, be_mult):
+        """
+        Vectorized equivalent of the bar-by-bar exit loop.
+        The multipliers may be scalars or per-entry arrays.
+        Returns (exit_idx, exit_price); exit_idx is -1 when no exit is found.
+        """
+        entry_idx = np.asarray(entry_idx, dtype=np.int64)
+        is_long, sl, tp, be_trigger = self.exit_levels(entry_types, entry_prices, atrs, sl_mult, tp_mult, be_mult)
+        exit_idx, exit_price, _ = self.resolve(entry_idx + 1, is_long, entry_prices, sl, tp, be_trigger)
+        return exit_idx, exit_price
+
+    def resolve(self, start, is_long, entry_prices, sl, tp, be_trigger):
+        """
+        First exit at or after `start` for the given levels.
+        Returns (exit_idx, exit_price, be_armed): be_armed marks trades still
+        open at the end whose stop was moved to entry (chunked.py resumes
+        them in the next block with sl = entry price and no BE trigger).
+        """
+        start = np.asarray(start, dtype=np.int64)
+        entry_prices = np.asarray(entry_prices, dtype=np.float64)
+        n = self.n
+
+        # Phase 1: original SL vs TP (longs stop on Lows, shorts on Highs)
+        sl_hit = self._touch(start, sl, ~is_long)
+        tp_hit = self._touch(start, tp, is_long)
+        be_hit = self._touch(start, be_trigger, is_long)
+
+        first_exit = np.minimum(sl_hit, tp_hit)
+
+        # Phase 2: BE armed strictly before the first exit -> stop moves to entry
+        # from the next bar on (the loop checks SL/TP before arming BE).
+        be_armed = be_hit < first_exit
+        be_start = np.minimum(be_hit + 1, n)
+        be_sl_hit = self._touch(be_start, entry_prices, ~is_long)
+        be_sl_hit = np.where(be_armed, be_sl_hit, n)
+
+        final_sl_hit = np.where(be_armed, be_sl_hit, sl_hit)
+        final_sl_price = np.where(be_armed, entry_prices, sl)
+
+        # SL is checked before TP on the same bar
+        exit_idx = np.minimum(final_sl_hit, tp_hit)
+        exit_price = np.where(final_sl_hit <= tp_hit, final_sl_price, tp)
+
+        exit_idx = np.where(exit_idx >= n, -1, exit_idx)
+        exit_price = np.where(exit_idx == -1, entry_prices, exit_price)
+        return exit_idx, exit_price, be_armed & (exit_idx == -1)
+
+
+def single_position_mask(entry_idx, exit_idx):
+    """
+    Entries taken when only one trade may be open, as the live bot trades:
+    after each taken entry the cursor jumps to that trade's exit bar (a
+    signal on the exit bar itself may open the next trade) and the signals
+    in between are skipped. A trade that never closes blocks the rest.
+    entry_idx must be sorted; exit_idx is -1 for trades never closed.
+    """
+    entry_idx = np.asarray(entry_idx)
+    exit_idx = np.asarray(exit_idx)
+    n = len(entry_idx)
+    resume = np.searchsorted(entry_idx, np.where(exit_idx == -1, np.iinfo(np.int64).max, exit_idx)).tolist()
+    taken = np.zeros(n, dtype=bool)
+    i = 0
+    while i < n:
+        taken[i] = True
+        i = resume[i]
+    return taken
+
+
+def find_exits_loop(highs, lows, entry_idx, entry_types, entry_prices, atrs, sl_mult, tp_mult, be_mult):
+    """
+    Reference bar-by-bar exit simulation (the original Backtester loop).
+    Kept for parity checks against ExitEngine.
+    """
+    exit_indices = np.full(len(entry_idx), -1, dtype=np.int64)
+    exit_prices = np.asarray(entry_prices, dtype=np.float64).copy()
+
+    for n, idx in enumerate(entry_idx):
+        entry_type = entry_types[n]
+        entry_price = entry_prices[n]
+        atr = atrs[n]
+
+        if entry_type == 1: # Long
+            sl = entry_price - (atr * sl_mult)
+            tp = entry_price + (atr * tp_mult)
+            be_trigger = entry_price + (atr * be_mult)
+        else: # Short
+            sl = entry_price + (atr * sl_mult)
+            tp = entry_price - (atr * tp_mult)
+            be_trigger = entry_price - (atr * be_mult)
+
+        is_be_active = False
+        search_highs = highs[idx+1:]
+        search_lows = lows[idx+1:]
+
+        for i in range(len(search_highs)):
+            current_high = search_highs[i]
+            current_low = search_lows[i]
+
+            if entry_type == 1: # Long
+                if current_low <= sl:   # SL
+                    exit_prices[n] = sl; exit_indices[n] = idx + 1 + i; break
+                if current_high >= tp:   # TP
+                    exit_prices[n] = tp; exit_indices[n] = idx + 1 + i; break
+                if not is_be_active and current_high >= be_trigger:
+                    sl = entry_price; is_be_active = True
+            else: # Short
+                if current_high >= sl:   # SL
+                    exit_prices[n] = sl; exit_indices[n] = idx + 1 + i; break
+                if current_low <= tp:   # TP
+                    exit_prices[n] = tp; exit_indices[n] = idx + 1 + i; break
+                if not is_be_active and current_low <= be_trigger:
+                    sl = entry_price; is_be_active = True
+
+    return exit_indices, exit_prices
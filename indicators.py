@@ -1,11 +1,87 @@
 import pandas as pd
 import numpy as np
+from instrumentation import INSTRUMENTS
+
+def _constant_run(x):
+    """Length of the run of equal values ending at every position."""
+    change = np.ones(len(x), dtype=bool)
+    change[1:] = x[1:] != x[:-1]
+    starts = np.flatnonzero(change)
+    return np.arange(len(x)) - np.repeat(starts, np.diff(np.append(starts, len(x)))) + 1
+
+def _window_stats(values, period, std=False):
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    m = len(x) - period + 1
+    if m <= 0:
+        return out
+    total = x[:m].copy()
+    for j in range(1, period):
+        total += x[j:j + m]
+    mean = total / period
+    constant = _constant_run(x)[period - 1:] >= period
+    if std:
+        ss = np.zeros(m)
+        for j in range(period):
+            ss += (x[j:j + m] - mean) ** 2
+        result = np.sqrt(ss / (period - 1)) if period > 1 else np.full(m, np.nan)
+        result[constant & (period > 1)] = 0.0
+    else:
+        result = np.where(constant, x[period - 1:], mean)
+    out[period - 1:] = result
+    return out
+
+def rolling_mean(series, period, window_local=False):
+    """
+    series.rolling(period).mean(). With window_local=True every window is
+    summed on its own (in bar order) instead of with pandas' running sum:
+    values then depend only on the window, never on earlier history, so a
+    chunked run with a warm-up tail reproduces them bit for bit (see
+    chunked.py). That costs O(bars * period), so only chunked runs use it.
+    """
+    if not window_local:
+        return series.rolling(period).mean()
+    return pd.Series(_window_stats(series.values, period), index=series.index)
+
+def rolling_std(series, period, window_local=False):
+    """series.rolling(period).std() (ddof=1); window_local as in rolling_mean."""
+    if not window_local:
+        return series.rolling(period).std()
+    return pd.Series(_window_stats(series.values, period, std=True), index=series.index)
+
+def trim_rows(df, mask):
+    """df[mask]; a plain slice (no copy) when the rows to keep are one block at the end."""
+    mask = np.asarray(mask)
+    first = int(mask.argmax()) if mask.any() else len(mask)
+    if mask[first:].all():
+        return df.iloc[first:]
+    return df[mask]
+
+def compact_dtype(df):
+    """float32 when the data was loaded in low-memory mode, else None."""
+    return np.float32 if df['price'].dtype == np.float32 else None
 
 class Indicators:
-    def __init__(self, df):
-        self.data = df.copy()
+    # Window-local rolling kernels (see rolling_mean); set by ChunkedBacktester
+    window_local = False
+
+    def __init__(self, df, bank=None):
+        self.bank = bank
+        # Indicators only add columns, so a shallow copy keeps the caller's frame intact
+        self.data = df if bank is not None else df.copy(deep=False)
+
+    def _mean(self, series, period):
+        return rolling_mean(series, period, self.window_local)
 
+    def _std(self, series, period):
+        return rolling_std(series, period, self.window_local)
+
+    @INSTRUMENTS.timed('indicators')
     def calculate_all(self, params):
+        if self.bank is not None:
+            self.data = self.bank.frame(params)
+            return
+
         df = self.data
         
         p_fast = int(params['sma_fast'])
@@ -15,14 +91,14 @@ class Indicators:
         p_atr = int(params['atr_period'])
         
         # 1. SMA
-        df[f"SMA_{p_fast}"] = df['price'].rolling(p_fast).mean()
-        df[f"SMA_{p_slow}"] = df['price'].rolling(p_slow).mean()
-        df[f"SMA_{p_trend}"] = df['price'].rolling(p_trend).mean()
+        df[f"SMA_{p_fast}"] = self._mean(df['price'], p_fast)
+        df[f"SMA_{p_slow}"] = self._mean(df['price'], p_slow)
+        df[f"SMA_{p_trend}"] = self._mean(df['price'], p_trend)
         
         # 2. Bollinger Bands
         bb_std = params['bb_std']
-        ma = df['price'].rolling(p_bb).mean()
-        sigma = df['price'].rolling(p_bb).std()
+        ma = self._mean(df['price'], p_bb)
+        sigma = self._std(df['price'], p_bb)
         
         df['BB_upper'] = ma + (bb_std * sigma)
         df['BB_lower'] = ma - (bb_std * sigma)
@@ -37,7 +113,117 @@ class Indicators:
         tr3 = np.abs(low - close)
         tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
         
-        df[f"ATR_{p_atr}"] = tr.rolling(p_atr).mean()
-        df['ATR_50'] = tr.rolling(50).mean()
+        df[f"ATR_{p_atr}"] = self._mean(tr, p_atr)
+        df['ATR_50'] = self._mean(tr, 50)
+
+        dtype = compact_dtype(df)
+        if dtype is not None:
+            for col in [f"SMA_{p_fast}", f"SMA_{p_slow}", f"SMA_{p_trend}", 'BB_upper', 'BB_lower',
+                        f"ATR_{p_atr}", 'ATR_50']:
+                df[col] = df[col].astype(dtype)
         
-        self.data = df.dropna()
\ No newline at end of file
+        self.data = trim_rows(df, df.notna().all(axis=1).values)
+
+
+class IndicatorBank:
+    """
+    Computes every distinct (indicator, period) series once per DataFrame
+    and serves it to any number of Strategy runs from a keyed cache.
+    Produces exactly the same frame as Indicators.calculate_all.
+    Series are cached as float32 when the base frame is (low-memory mode).
+    """
+    def __init__(self, df):
+        self.base = df
+        self.dtype = compact_dtype(df)
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key, builder):
+        if key in self.cache:
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        value = builder()
+        if self.dtype is not None and isinstance(value, pd.Series) and value.dtype == np.float64:
+            value = value.astype(self.dtype)
+        self.cache[key] = value
+        return value
+
+    def nbytes(self):
+        return sum(getattr(v, 'nbytes', 0) for v in self.cache.values())
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.cache), 'bytes': self.nbytes()}
+
+    # --- Raw series ---
+    def sma(self, period):
+        return self._get(('SMA', period), lambda: self.base['price'].rolling(period).mean())
+
+    def bb_mean(self, period):
+        # Same rolling mean as the SMA of that period
+        return self.sma(period)
+
+    def bb_sigma(self, period):
+        return self._get(('BB_STD', period), lambda: self.base['price'].rolling(period).std())
+
+    def bb_band(self, period, bb_std, side):
+        def build():
+            ma = self.bb_mean(period)
+            sigma = self.bb_sigma(period)
+            return ma + (bb_std * sigma) if side == 'upper' else ma - (bb_std * sigma)
+        return self._get(('BB', period, bb_std, side), build)
+
+    def true_range(self):
+        def build():
+            df = self.base
+            close = df['price'].shift(1)
+            tr1 = df['High'] - df['Low']
+            tr2 = np.abs(df['High'] - close)
+            tr3 = np.abs(df['Low'] - close)
+            return pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+        return self._get(('TR',), build)
+
+    def atr(self, period):
+        return self._get(('ATR', period), lambda: self.true_range().rolling(period).mean())
+
+    # --- Assembled frames ---
+    @staticmethod
+    def _periods(params):
+        return (int(params['sma_fast']), int(params['sma_slow']), int(params['sma_trend']),
+                int(params['bb_period']), int(params['atr_period']))
+
+    def valid_rows(self, params):
+        """Boolean mask equal to the dropna() at the end of calculate_all."""
+        periods = self._periods(params)
+        p_fast, p_slow, p_trend, p_bb, p_atr = periods
+
+        def build():
+            mask = self._get(('BASE_VALID',), lambda: self.base.notna().all(axis=1).values)
+            for s in [self.sma(p_fast), self.sma(p_slow), self.sma(p_trend),
+                      self.bb_sigma(p_bb), self.atr(p_atr), self.atr(50)]:
+                mask = mask & s.notna().values
+            return mask
+        return self._get(('VALID',) + periods, build)
+
+    def frame(self, params):
+        """Trimmed DataFrame with the same columns calculate_all adds (cached series are not copied)."""
+        p_fast, p_slow, p_trend, p_bb, p_atr = self._periods(params)
+        bb_std = params['bb_std']
+
+        cols = {c: self.base[c] for c in self.base.columns}
+        cols[f"SMA_{p_fast}"] = self.sma(p_fast)
+        cols[f"SMA_{p_slow}"] = self.sma(p_slow)
+        cols[f"SMA_{p_trend}"] = self.sma(p_trend)
+        cols['BB_upper'] = self.bb_band(p_bb, bb_std, 'upper')
+        cols['BB_lower'] = self.bb_band(p_bb, bb_std, 'lower')
+        cols[f"ATR_{p_atr}"] = self.atr(p_atr)
+        cols['ATR_50'] = self.atr(50)
+
+        return trim_rows(pd.DataFrame(cols, copy=False), self.valid_rows(params))
+
+    def atr_baseline(self, params):
+        """ATR_50 as Strategy computes it: rolling(50) of ATR over the trimmed frame."""
+        p_atr = int(params['atr_period'])
+        key = ('ATR_BASELINE',) + self._periods(params)
+        return self._get(key, lambda: self.atr(p_atr)[self.valid_rows(params)].rolling(50).mean())
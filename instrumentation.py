@@ -0,0 +1,293 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Histogram bucket bounds (seconds) for every timer
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+def _key(name, labels):
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+def _write_atomic(path, text):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class Instruments:
+    """
+    Process-wide stage timers, counters and gauges.
+
+        with INSTRUMENTS.timer('indicators'): ...
+        @INSTRUMENTS.timed('mt5_call', call='tick')
+        INSTRUMENTS.count('notifications', status='sent')
+
+    Timers keep count / sum / max and histogram buckets. Optimizer workers
+    drain() their own instruments into each chunk's stats and the parent
+    merge()s them, so the parent holds the totals for the whole run.
+    Export with write_json() / write_prometheus() (text exposition format).
+    """
+    def __init__(self, prefix='algo'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.timers = {}
+            self.counters = {}
+            self.gauges = {}
+
+    # --- Recording ---
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self.lock:
+            t = self.timers.get(key)
+            if t is None:
+                t = self.timers[key] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKETS)}
+            t['count'] += 1
+            t['sum'] += seconds
+            t['max'] = max(t['max'], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    t['buckets'][i] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator form of timer()."""
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def count(self, name, n=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[_key(name, labels)] = value
+
+    # --- Snapshots ---
+    def snapshot(self):
+        """JSON-friendly copy of everything recorded so far."""
+        def rows(table, value):
+            return [{'name': name, 'labels': dict(labels), **value(v)} for (name, labels), v in table.items()]
+        with self.lock:
+            return {
+                'time': time.time(),
+                'pid': os.getpid(),
+                'timers': rows(self.timers, lambda t: {**t, 'buckets': list(t['buckets'])}),
+                'counters': rows(self.counters, lambda v: {'value': v}),
+                'gauges': rows(self.gauges, lambda v: {'value': v}),
+            }
+
+    def drain(self):
+        """snapshot() and reset() in one step (what a worker ships to its parent)."""
+        with self.lock:
+            timers, counters, gauges = self.timers, self.counters, self.gauges
+            self.timers, self.counters, self.gauges = {}, {}, {}
+        shipped = Instruments(self.prefix)
+        shipped.timers, shipped.counters, shipped.gauges = timers, counters, gauges
+        return shipped.snapshot()
+
+    def merge(self, snapshot):
+        if not snapshot:
+            return
+        with self.lock:
+            for row in snapshot['timers']:
+                key = _key(row['name'], row['labels'])
+                t = self.timers.get(key)
+                if t is None:
+                    t = self.timers[key] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKETS)}
+                t['count'] += row['count']
+                t['sum'] += row['sum']
+                t['max'] = max(t['max'], row['max'])
+                t['buckets'] = [a + b for a, b in zip(t['buckets'], row['buckets'])]
+            for row in snapshot['counters']:
+                key = _key(row['name'], row['labels'])
+                self.counters[key] = self.counters.get(key, 0) + row['value']
+            for row in snapshot['gauges']:
+                self.gauges[_key(row['name'], row['labels'])] = row['value']
+
+    # --- Export ---
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.snapshot(), indent=2, default=str))
+
+    def to_prometheus(self):
+        def labels(pairs, extra=()):
+            pairs = list(pairs) + list(extra)
+            if not pairs:
+                return ""
+            esc = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, pairs), t in sorted(self.timers.items()):
+                metric = f"{self.prefix}_{name}_seconds"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                for bound, n in zip(BUCKETS, t['buckets']):
+                    lines.append(f"{metric}_bucket{labels(pairs, [('le', bound)])} {n}")
+                lines.append(f"{metric}_bucket{labels(pairs, [('le', '+Inf')])} {t['count']}")
+                lines.append(f"{metric}_sum{labels(pairs)} {t['sum']:.6f}")
+                lines.append(f"{metric}_count{labels(pairs)} {t['count']}")
+            for (name, pairs), v in sorted(self.counters.items()):
+                metric = f"{self.prefix}_{name}_total"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{labels(pairs)} {v}")
+            for (name, pairs), v in sorted(self.gauges.items()):
+                metric = f"{self.prefix}_{name}"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric}{labels(pairs)} {v}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Text file for node_exporter's textfile collector (written atomically)."""
+        _write_atomic(path, self.to_prometheus())
+
+    def export(self, basename):
+        """Writes <basename>.json and <basename>.prom."""
+        self.write_json(basename + '.json')
+        self.write_prometheus(basename + '.prom')
+
+    def print_report(self):
+        print("\n" + "="*40)
+        print("⏱️ STAGE TIMERS")
+        print("="*40)
+        with self.lock:
+            timers = sorted(self.timers.items(), key=lambda kv: -kv[1]['sum'])
+        for (name, pairs), t in timers:
+            label = name + ("".join(f" {k}={v}" for k, v in pairs) if pairs else "")
+            print(f"{label:<30}: {t['count']:>6} calls, {t['sum']:.3f}s total, "
+                  f"{t['sum'] / t['count'] * 1000:.2f} ms avg, {t['max'] * 1000:.1f} ms max")
+        print("="*40 + "\n")
+
+
+def worker_throughput(snapshots, instruments=None):
+    """
+    Combinations per busy second per optimizer worker, from one run's
+    drained worker snapshots. Also stored as gauges, replacing those of
+    earlier runs.
+    """
+    instruments = instruments or INSTRUMENTS
+    combos, busy = Counter(), Counter()
+    for snap in filter(None, snapshots):
+        for r in snap['counters']:
+            if r['name'] == 'worker_combos':
+                combos[r['labels']['worker']] += r['value']
+        for r in snap['timers']:
+            if r['name'] == 'worker_chunk':
+                busy[r['labels']['worker']] += r['sum']
+    rates = {w: combos[w] / busy[w] for w in combos if busy.get(w)}
+    with instruments.lock:
+        for key in [k for k in instruments.gauges if k[0] == 'worker_combos_per_second']:
+            del instruments.gauges[key]
+    for worker, rate in rates.items():
+        instruments.gauge('worker_combos_per_second', round(rate, 2), worker=worker)
+    return rates
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be switched on and off at runtime.
+    A daemon thread samples the Python stack of every other thread each
+    `interval` seconds; stacks are counted in the collapsed format
+    ("file:func;file:func N") that flamegraph tools read.
+    Only sees the process it runs in (not joblib worker processes).
+    """
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.running:
+            self.stop_event.set()
+            self.thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top(self, n=15):
+        """Functions with the most samples at the top of the stack: [(function, share)]."""
+        leaves = Counter()
+        for stack, hits in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += hits
+        total = sum(leaves.values()) or 1
+        return [(fn, hits / total) for fn, hits in leaves.most_common(n)]
+
+    def write_collapsed(self, path):
+        _write_atomic(path, "".join(f"{stack} {hits}\n" for stack, hits in self.stacks.most_common()))
+
+    def follow_flag(self, flag_path, output_path):
+        """
+        Runtime switch: profiles while `flag_path` exists. When the flag is
+        removed the profile is written to `output_path` and cleared.
+        """
+        if os.path.exists(flag_path):
+            self.start()
+        elif self.running:
+            self.stop()
+            self.write_collapsed(output_path)
+            self.stacks.clear()
+            self.samples = 0
+        return self.running
+
+
+INSTRUMENTS = Instruments()
+PROFILER = SamplingProfiler()
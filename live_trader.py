@@ -1,163 +1,340 @@
-import MetaTrader5 as mt5
-import pandas as pd
-import time
 import datetime
 import json
 import os
-from strategy import Strategy
-from telegram_notify import send_telegram_msg 
+from concurrent.futures import ThreadPoolExecutor
+from streaming_strategy import StreamingStrategy
+from scheduler import Scheduler, ServerClock, LatencyTracker
+from notifier import Notifier, TelegramSink
+from broker import MT5Broker
+from data_loader import TIMEFRAMES
+from instrumentation import INSTRUMENTS, PROFILER
 
+# Single-symbol defaults (used when SYMBOLS_FILE does not exist)
 SYMBOL = "EURUSD"       
-TIMEFRAME = mt5.TIMEFRAME_H1
+TIMEFRAME = "H1"        # M1 ... D1 (see data_loader.TIMEFRAMES)
+TIMEFRAME_SECONDS = TIMEFRAMES[TIMEFRAME]
 VOLUME = 0.01           
 DEVIATION = 10          
 MAGIC_NUMBER = 999001   
 PARAMS_FILE = "best_params.json"
+# Multi-symbol config: [{"symbol": "GBPUSD", "params_file": "...", "magic": 999002, "volume": 0.01}, ...]
+SYMBOLS_FILE = "symbols.json"
+SIGNAL_WORKERS = 8      # Threads used to update the per-symbol engines
+HISTORY_BARS = 500      # Warm-up history for the streaming engine
+POLL_BARS = 3           # Closed bars fetched per poll once warmed up
+BAR_CLOSE_GRACE = 0.5   # Seconds after the server bar close before evaluating
+BAR_RETRY_SECONDS = 0.5 # Re-poll delay while the closed bar is not published
+BAR_WAIT_TIMEOUT = 30   # Give up waiting for a bar (market closed / no ticks)
+ERROR_RETRY_SECONDS = 10  # Re-run a bar evaluation that raised (e.g. transient MT5 error)
+CLOCK_SYNC_SECONDS = 30
+HEARTBEAT_SECONDS = 60
+LATENCY_FILE = "latency_log.jsonl"
+METRICS_BASENAME = "live_metrics"   # -> live_metrics.json / live_metrics.prom (textfile collector)
+METRICS_SECONDS = 15
+PROFILE_FLAG = "profile.on"         # create to start the sampling profiler, delete to stop
+PROFILE_OUTPUT = "live_profile.folded"
 
-def load_best_params():
+# Telegram runs on a background queue; the trading path only enqueues
+NOTIFIER = Notifier(TelegramSink(), min_interval=1.0, coalesce_window=0.5)
+
+def notify(msg):
+    NOTIFIER.send(msg)
+
+def load_best_params(params_file=PARAMS_FILE):
     """Optimizer"""
-    if not os.path.exists(PARAMS_FILE):
-        print(f"❌ Error: '{PARAMS_FILE}' not found!")
+    if not os.path.exists(params_file):
+        print(f"❌ Error: '{params_file}' not found!")
         print("Please run 'main.py' first to generate strategy parameters.")
         quit()
         
-    with open(PARAMS_FILE, "r") as f:
+    with open(params_file, "r") as f:
         params = json.load(f)
     
-    print(f"\n✅ Loaded Strategy Parameters from {PARAMS_FILE}")
+    print(f"\n✅ Loaded Strategy Parameters from {params_file}")
     return params
 
-def initialize_mt5():
-    if not mt5.initialize():
+def load_symbol_configs():
+    """
+    One dict per traded symbol: symbol, params_file, magic, volume.
+    Falls back to the single-symbol constants above.
+    """
+    if not os.path.exists(SYMBOLS_FILE):
+        return [{'symbol': SYMBOL, 'params_file': PARAMS_FILE, 'magic': MAGIC_NUMBER, 'volume': VOLUME}]
+
+    with open(SYMBOLS_FILE, "r") as f:
+        entries = json.load(f)
+
+    configs = []
+    for entry in entries:
+        configs.append({
+            'symbol': entry['symbol'],
+            'params_file': entry.get('params_file', PARAMS_FILE),
+            'magic': int(entry['magic']),
+            'volume': float(entry.get('volume', VOLUME)),
+        })
+
+    magics = [c['magic'] for c in configs]
+    if len(set(magics)) != len(magics):
+        raise ValueError(f"Magic numbers in '{SYMBOLS_FILE}' must be unique: {magics}")
+    return configs
+
+def initialize_broker(broker, configs):
+    if not broker.initialize():
         print("❌ MT5 Initialize failed")
         quit()
     
-    account = mt5.account_info()
+    account = broker.account_info()
     if not account:
         print("❌ Not connected to account")
         quit()
         
-    msg = f"🤖 <b>Bot Started Successfully!</b>\nAsset: {SYMBOL}\nMode: Auto-JSON Params"
+    assets = ", ".join(c['symbol'] for c in configs)
+    msg = f"🤖 <b>Bot Started Successfully!</b>\nAssets: {assets}\nMode: Auto-JSON Params"
     print(msg)
-    send_telegram_msg(msg)
-
-def get_live_data():
-    rates = mt5.copy_rates_from_pos(SYMBOL, TIMEFRAME, 0, 500)
-    if rates is None: return None
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    rename = {'time': 'Datetime', 'close': 'price', 'high': 'High', 'low': 'Low', 'open': 'Open', 'tick_volume': 'Volume'}
-    df.rename(columns=rename, inplace=True)
-    df.set_index('Datetime', inplace=True)
-    return df
-
-def execute_trade(signal, price, sl, tp):
-    positions = mt5.positions_get(symbol=SYMBOL)
-    for pos in positions:
-        if pos.magic == MAGIC_NUMBER:
-            return
+    notify(msg)
+
+def get_live_data(broker, symbol=SYMBOL, start_pos=0, count=HISTORY_BARS, timeframe_seconds=TIMEFRAME_SECONDS):
+    return broker.rates(symbol, timeframe_seconds, start_pos, count)
+
+def get_open_positions(broker):
+    """One positions query for every symbol: set of (symbol, magic)."""
+    return {(pos.symbol, pos.magic) for pos in broker.positions()}
+
+def execute_trade(broker, config, signal, price, sl, tp, decision=None, open_positions=None):
+    symbol = config['symbol']
+    if open_positions is None:
+        open_positions = get_open_positions(broker)
+    if (symbol, config['magic']) in open_positions:
+        return
 
-    order_type = mt5.ORDER_TYPE_BUY if signal == 1 else mt5.ORDER_TYPE_SELL
     type_str = "BUY 🟢" if signal == 1 else "SELL 🔴"
+
+    if decision: decision.mark('order_send')
+    result = broker.market_order(symbol, signal, config['volume'], price, sl, tp,
+                                 config['magic'], DEVIATION, "Algo-Pro Bot")
+    if decision: decision.mark('order_done')
     
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": SYMBOL,
-        "volume": VOLUME,
-        "type": order_type,
-        "price": price,
-        "sl": sl,
-        "tp": tp,
-        "deviation": DEVIATION,
-        "magic": MAGIC_NUMBER,
-        "comment": "Algo-Pro Bot",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
-    }
-
-    result = mt5.order_send(request)
-    
-    if result.retcode == mt5.TRADE_RETCODE_DONE:
+    if result.ok:
         msg = f"""
 🚀 <b>New Trade Opened!</b>
 ---------------------
+<b>Asset:</b> {symbol}
 <b>Type:</b> {type_str}
 <b>Price:</b> {price}
 <b>SL:</b> {sl:.5f}
 <b>TP:</b> {tp:.5f}
-<b>Size:</b> {VOLUME}
+<b>Size:</b> {config['volume']}
         """
         print(msg)
-        send_telegram_msg(msg)
+        notify(msg)
     else:
-        print("❌ Order Failed:", result.comment)
+        print(f"❌ Order Failed ({symbol}):", result.comment)
 
-def run_live():
-    strategy_params = load_best_params()
-    
-    # 2. חיבור
-    initialize_mt5()
-    
-    hourly_msg_sent = False
+def sync_clock(broker, clock, symbol=SYMBOL):
+    tick = broker.tick(symbol)
+    if tick:
+        clock.add_sample(tick.time_msc / 1000.0)
+
+def send_hourly_status(broker, symbols):
+    now = datetime.datetime.now()
+    account = broker.account_info()
+    prices = []
+    for symbol in symbols:
+        tick = broker.tick(symbol)
+        if tick:
+            prices.append(f"💶 {symbol}: {(tick.ask + tick.bid) / 2:.5f}")
+    prices = "\n".join(prices)
     
-    while True:
-        try:
-            now = datetime.datetime.now()
-
-            if now.minute == 0 and not hourly_msg_sent:
-                tick = mt5.symbol_info_tick(SYMBOL)
-                account = mt5.account_info()
-                current_price = (tick.ask + tick.bid) / 2
-                
-                status_msg = f"""
+    status_msg = f"""
 ⏱ <b>Hourly Update ({now.strftime('%H:%M')})</b>
 ---------------------
 ✅ Status: <b>Running</b>
-💶 Price: {current_price:.5f}
+{prices}
 💰 Equity: ${account.equity}
 ---------------------
-                """
-                send_telegram_msg(status_msg)
-                print(f"Sent hourly update at {now}")
-                hourly_msg_sent = True 
-            
-            elif now.minute != 0:
-                hourly_msg_sent = False
+    """
+    notify(status_msg)
+    print(f"Sent hourly update at {now}")
+
+class SymbolBot:
+    """Streaming strategy state for one symbol."""
+    def __init__(self, config, params):
+        self.config = config
+        self.symbol = config['symbol']
+        self.params = params
+        self.engine = None
+        self.last_bar_time = None
+
+    def bars_to_fetch(self):
+        return HISTORY_BARS if self.engine is None else POLL_BARS
+
+    def ingest(self, df):
+        """
+        Feeds newly closed bars to the engine; returns how many were added,
+        or None when bars were missed and the engine must re-warm.
+        """
+        if self.engine is None:
+            self.engine = StreamingStrategy(self.params)
+            self.engine.warm_up(df)
+            self.last_bar_time = df.index[-1]
+            return 1
+
+        new_bars = df[df.index > self.last_bar_time]
+        if len(new_bars) == len(df):
+            # Missed more bars than we poll (reconnect): re-warm from history
+            self.engine = None
+            return None
+        for t, bar in new_bars.iterrows():
+            self.engine.update(bar['High'], bar['Low'], bar['price'], time=t)
+        if not new_bars.empty:
+            self.last_bar_time = new_bars.index[-1]
+        return len(new_bars)
+
+class LiveEngine:
+    """
+    Trades every configured symbol from one process and one MT5 connection.
+    Each bar close runs one cycle: rates for all symbols, parallel signal
+    evaluation, then a single positions snapshot for all order decisions.
+    """
+    def __init__(self, broker, configs, clock, tracker, max_workers=SIGNAL_WORKERS,
+                 timeframe_seconds=TIMEFRAME_SECONDS):
+        self.broker = broker
+        self.timeframe_seconds = timeframe_seconds
+        self.bots = [SymbolBot(c, load_best_params(c['params_file'])) for c in configs]
+        for bot in self.bots:
+            tf = bot.params.get('timeframe')
+            if tf is not None and TIMEFRAMES[tf] != timeframe_seconds:
+                print(f"⚠️ {bot.symbol}: parameters were optimized on {tf}, trading {timeframe_seconds}s bars")
+        self.clock = clock
+        self.tracker = tracker
+        self.pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(self.bots))))
+        self.decisions = {}
 
-            df = get_live_data()
-            if df is None:
-                time.sleep(10)
+    @property
+    def symbols(self):
+        return [bot.symbol for bot in self.bots]
+
+    @INSTRUMENTS.timed('live_cycle')
+    def on_bar_close(self):
+        server_now = self.clock.server_now()
+        tf = self.timeframe_seconds
+        bar_open = (server_now // tf) * tf
+        expected_bar = int(bar_open - tf)
+
+        for bot in self.bots:
+            decision = self.decisions.get(bot.symbol)
+            if decision is None or decision.bar_time != expected_bar:
+                decision = self.tracker.start(expected_bar, self.clock.to_local(bar_open))
+                decision.info.update({'symbol': bot.symbol, 'bars': 0})
+                decision.mark('wake')
+                self.decisions[bot.symbol] = decision
+
+        # 1. Rates for every symbol still waiting on this bar (one MT5 connection)
+        pending = [bot for bot in self.bots
+                   if bot.last_bar_time is None or bot.last_bar_time.timestamp() < expected_bar]
+        frames = {bot.symbol: get_live_data(self.broker, bot.symbol, start_pos=1,
+                                              count=bot.bars_to_fetch(), timeframe_seconds=tf)
+                  for bot in pending}
+
+        # 2. Update the streaming engines in parallel
+        ready = [bot for bot in pending if frames[bot.symbol] is not None]
+        for bot, added in zip(ready, self.pool.map(lambda b: b.ingest(frames[b.symbol]), ready)):
+            if added:
+                self.decisions[bot.symbol].info['bars'] += added
+
+        waiting = [bot for bot in self.bots
+                   if bot.last_bar_time is None or bot.last_bar_time.timestamp() < expected_bar]
+        if waiting and server_now - bar_open < BAR_WAIT_TIMEOUT:
+            # Broker has not published the closed bar for some symbols yet
+            return BAR_RETRY_SECONDS
+
+        # 3. Orders: one positions snapshot for all symbols
+        signals = []
+        for bot in self.bots:
+            decision = self.decisions[bot.symbol]
+            if decision.info['bars'] == 0:
+                self.tracker.finish(self.decisions.pop(bot.symbol), signal=None, note='no new bar')
                 continue
+            decision.mark('data')
+            last_candle = bot.engine.last
+            decision.mark('signal')
+            if last_candle['position'] != 0:
+                signals.append((bot, last_candle, decision))
+            else:
+                self.tracker.finish(self.decisions.pop(bot.symbol), signal=0, price=last_candle['price'])
 
-            strategy = Strategy(df, params=strategy_params)
-            strategy.run_strategy()
-            
-            last_candle = strategy.data.iloc[-2]
+        # Signals stay pending until here: if the snapshot fails, a retry still sees them
+        open_positions = get_open_positions(self.broker) if signals else set()
+        for bot, last_candle, decision in signals:
+            del self.decisions[bot.symbol]
             signal = last_candle['position']
-            
-            print(f"\r⏳ {now.strftime('%H:%M:%S')} | Price: {last_candle['price']:.5f} | Signal: {signal} ", end="")
-            
-            if signal != 0:
-                tick = mt5.symbol_info_tick(SYMBOL)
-                market_price = tick.ask if signal == 1 else tick.bid
-                
-                if signal == 1:
-                    sl = last_candle['long_sl_val']
-                    tp = last_candle['long_tp_val']
-                else:
-                    sl = last_candle['short_sl_val']
-                    tp = last_candle['short_tp_val']
-                
-                execute_trade(signal, market_price, sl, tp)
-                print("💤 Signal processed. Sleeping for 1 hour...")
-                time.sleep(3600) 
-            
-            time.sleep(60)
+            # One symbol's failure must not cost the others their signal
+            try:
+                self._place_order(bot, last_candle, decision, open_positions)
+            except Exception as e:
+                print(f"\n❌ Order error ({bot.symbol}): {e}")
+                notify(f"⚠️ <b>ORDER ERROR</b>\n{bot.symbol}: {e}")
+                decision.info['error'] = str(e)
+            self.tracker.finish(decision, signal=int(signal), price=last_candle['price'])
+        return None
+
+    def _place_order(self, bot, last_candle, decision, open_positions):
+        signal = last_candle['position']
+        tick = self.broker.tick(bot.symbol)
+        if tick is None:
+            print(f"\n⚠️ {bot.symbol}: no tick, signal skipped")
+            decision.info['note'] = 'no tick'
+            return
+        market_price = tick.ask if signal == 1 else tick.bid
+
+        if signal == 1:
+            sl = last_candle['long_sl_val']
+            tp = last_candle['long_tp_val']
+        else:
+            sl = last_candle['short_sl_val']
+            tp = last_candle['short_tp_val']
+
+        execute_trade(self.broker, bot.config, signal, market_price, sl, tp, decision, open_positions)
+
+    def heartbeat(self):
+        now = datetime.datetime.now()
+        parts = [f"{bot.symbol} {bot.engine.last['price']:.5f} ({bot.engine.last['position']})"
+                 for bot in self.bots if bot.engine is not None and bot.engine.last is not None]
+        if not parts:
+            return
+        lat = self.tracker.summary().get('signal', {}).get('p50', '-')
+        print(f"\r⏳ {now.strftime('%H:%M:%S')} | {' | '.join(parts)} | Bar→Signal p50: {lat} ms ", end="")
+
+def export_metrics():
+    """Writes the live timers/counters and applies the profiler switch file."""
+    INSTRUMENTS.gauge('notifier_queue', NOTIFIER.queue.qsize())
+    INSTRUMENTS.export(METRICS_BASENAME)
+    PROFILER.follow_flag(PROFILE_FLAG, PROFILE_OUTPUT)
+
+def on_job_error(name, e):
+    print(f"\n❌ Error ({name}): {e}")
+    notify(f"⚠️ <b>CRITICAL ERROR</b>\nBot crashed: {e}")
+
+def run_live(broker=None):
+    configs = load_symbol_configs()
+    broker = broker or MT5Broker()
+    
+    # 2. חיבור
+    initialize_broker(broker, configs)
+
+    clock = ServerClock()
+    sync_clock(broker, clock, configs[0]['symbol'])
+    engine = LiveEngine(broker, configs, clock, LatencyTracker(LATENCY_FILE))
 
-        except Exception as e:
-            print(f"\n❌ Error: {e}")
-            send_telegram_msg(f"⚠️ <b>CRITICAL ERROR</b>\nBot crashed: {e}")
-            time.sleep(10)
+    scheduler = Scheduler(clock, on_error=on_job_error)
+    # Evaluate the last closed bar right away, then on every bar close
+    scheduler.every_bar_close('signal', TIMEFRAME_SECONDS, engine.on_bar_close, grace=BAR_CLOSE_GRACE,
+                              run_now=True, error_retry=ERROR_RETRY_SECONDS)
+    scheduler.every('clock_sync', CLOCK_SYNC_SECONDS, lambda: sync_clock(broker, clock, configs[0]['symbol']))
+    scheduler.every('heartbeat', HEARTBEAT_SECONDS, engine.heartbeat)
+    scheduler.every('metrics', METRICS_SECONDS, export_metrics)
+    scheduler.every('hourly_status', 3600, lambda: send_hourly_status(broker, engine.symbols), align=True)
+    scheduler.run()
 
 import traceback
 
@@ -167,7 +344,8 @@ if __name__ == "__main__":
         
     except KeyboardInterrupt:
         print("🛑 Bot stopped by user.")
-        send_telegram_msg("🛑 <b>Bot Stopped Manually</b>")
+        notify("🛑 <b>Bot Stopped Manually</b>")
+        NOTIFIER.close(timeout=10)
         
     except Exception as e:
         error_trace = traceback.format_exc()
@@ -182,7 +360,8 @@ The bot stopped working.
 -----------------------------
 Restarting automatically in 5 seconds...
         """
-        send_telegram_msg(crash_msg)
+        notify(crash_msg)
+        NOTIFIER.close(timeout=10)
         
         raise e
 
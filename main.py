@@ -1,47 +1,84 @@
 from data_loader import DataLoad
 from backtester import Backtester
 from optimizer import Optimizer
+from walk_forward import WalkForward
+from search import AdaptiveSearch
+from result_store import ResultStore
+from monte_carlo import MonteCarlo
+from distributed import FileQueueBackend
+from memory import MemoryTracker
+from instrumentation import INSTRUMENTS, PROFILER
 import visualization as viz
 import json 
 
 # ==========================================
-FILE_PATH = 'data/EURUSD-365D-1H.csv'
+FILE_PATH = 'data/EURUSD-365D-1H.csv'   # finest export; coarser timeframes are resampled from it
+TIMEFRAMES = ["H1"]        # e.g. ["M30", "H1", "H4"]: timeframe becomes a grid dimension
 MIN_TRADES = 30  
 PARAMS_FILE = "best_params.json"
+RESULTS_DB = "results.db"   # grid results persist here; re-runs resume
+SEARCH_METHOD = "grid"     # or "halving", "zoom", "guided"
+SEARCH_SECONDS = None      # time budget for the adaptive searches
+RUN_WALK_FORWARD = False   # out-of-sample check of the optimization
+MONTE_CARLO_PATHS = 10_000 # resampled trade sequences for the champion (0: off)
+MONTE_CARLO_METHOD = "bootstrap"   # or "permute", "skip"
+LOW_MEMORY = False         # float32 data/indicators for multi-year or low-timeframe files
+SINGLE_POSITION = False    # one open trade at a time, like the live bot
+QUEUE_DIR = None           # e.g. "/mnt/share/algo_queue": grid chunks go to 'python distributed.py worker <dir>' processes
+LOCAL_WORKERS = 0          # queue workers to start on this machine as well
+METRICS_BASENAME = "run_metrics"   # stage timers -> run_metrics.json / run_metrics.prom (None: off)
+PROFILE = False            # sampling profiler on the main process -> profile.folded
+CHART_FILE = None          # e.g. "report.html" / "chart.png": write the chart instead of opening a window
 # ==========================================
 
 def run_auto_pilot():
+    memory = MemoryTracker(enabled=LOW_MEMORY)
     print(f"--- 1. Loading Data: {FILE_PATH} ---")
     try:
-        loader = DataLoad(FILE_PATH)
-        df = loader.process_data()
-        print(f"Successfully loaded {len(df)} candles.")
+        with memory.stage("load"):
+            loader = DataLoad(FILE_PATH, low_memory=LOW_MEMORY)
+            df = loader.process_data()
+        print(f"Successfully loaded {len(df)} candles. (cache: {loader.cache_status})")
     except Exception as e:
         print(f"Error: {e}")
         return
 
-    print("\n--- 2. Running Optimization ---")
-    opt = Optimizer(df)
-    results = opt.optimize() 
+    frames = None
+    if TIMEFRAMES != [loader.base_timeframe()]:
+        with memory.stage("resample"):
+            frames = {tf: loader.resample(tf) for tf in TIMEFRAMES}
+        print("Timeframes: " + ", ".join(f"{tf} ({len(f)} bars)" for tf, f in frames.items()))
 
-    if results.empty:
-        print("No trades generated.")
-        return
+    print("\n--- 2. Running Optimization ---")
+    with memory.stage("optimize"):
+        # The adaptive searches run on one frame; several timeframes use the grid
+        if SEARCH_METHOD == "grid" or frames:
+            store = ResultStore(df, RESULTS_DB, single_position=SINGLE_POSITION)
+            backend = FileQueueBackend(QUEUE_DIR, local_workers=LOCAL_WORKERS) if QUEUE_DIR else None
+            opt = Optimizer(df, min_trades=MIN_TRADES, store=store, frames=frames, single_position=SINGLE_POSITION,
+                            backend=backend)
+            opt.optimize()
+            top_results = store.top(10, min_trades=MIN_TRADES)
+            store.close()
+        else:
+            search = AdaptiveSearch(df, method=SEARCH_METHOD, min_trades=MIN_TRADES, max_seconds=SEARCH_SECONDS,
+                                    single_position=SINGLE_POSITION)
+            results = search.run()
+            if not results.empty:
+                results = results[results['Total Trades'] >= MIN_TRADES]
+            top_results = results.sort_values('Total Profit ($)', ascending=False) if not results.empty else results
 
-    valid_results = results[results['Total Trades'] >= MIN_TRADES].copy()
-    
-    if valid_results.empty:
+    if top_results.empty:
         print(f"Optimization finished, but no strategy met the requirements.")
         return
 
     print("\n======= 🏆 TOP 10 CONFIGURATIONS 🏆 =======")
-    top_results = valid_results.sort_values('Total Profit ($)', ascending=False)
     
     cols_to_show = [
         'Total Profit ($)', 'Max Drawdown ($)', 'Profit Factor', 'Win Rate (%)', 
         'sl_multiplier', 'tp_multiplier', 'be_multiplier',
         'sma_fast', 'sma_slow'
-    ]
+    ] + (['timeframe'] if 'timeframe' in top_results.columns else [])
     print(top_results.head(10)[cols_to_show].to_string(index=False))
     
     best_row = top_results.iloc[0]
@@ -49,7 +86,7 @@ def run_auto_pilot():
     
     clean_params = {k: v for k, v in best_params.items() if k in [
         'sma_fast', 'sma_slow', 'sma_trend', 'bb_period', 'bb_std', 
-        'atr_period', 'range_atr_filter', 'sl_multiplier', 'tp_multiplier', 'be_multiplier'
+        'atr_period', 'range_atr_filter', 'sl_multiplier', 'tp_multiplier', 'be_multiplier', 'timeframe'
     ]}
 
     print("\n--- 3. Saving Champion to File ---")
@@ -60,12 +97,44 @@ def run_auto_pilot():
     print(f"✅ Saved parameters to '{PARAMS_FILE}'. Live bot will use this!")
 
     print(f"Running Re-Test for Charting...")
-    champion_bot = Backtester(df, params=clean_params, position_size=1000)
-    final_metrics = champion_bot.run_backtest()
+    if 'timeframe' in clean_params:
+        df = loader.resample(clean_params['timeframe'])
+    with memory.stage("re-test"):
+        champion_bot = Backtester(df, params=clean_params, position_size=1000, single_position=SINGLE_POSITION)
+        final_metrics = champion_bot.run_backtest()
     champion_bot.print_summary()
+    if MONTE_CARLO_PATHS and not champion_bot.trades.empty:
+        mc = MonteCarlo(champion_bot.trades, n_paths=MONTE_CARLO_PATHS, method=MONTE_CARLO_METHOD)
+        mc.run()
+        mc.print_summary()
+    if memory.enabled:
+        memory.print_report()
     
     if not champion_bot.trade_log.empty:
-        viz.plot_performance(df, champion_bot.trade_log, final_metrics)
+        viz.plot_performance(champion_bot.data, champion_bot.trade_log, final_metrics, output=CHART_FILE)
+
+    if RUN_WALK_FORWARD:
+        print("\n--- 4. Walk-Forward Analysis ---")
+        wf = WalkForward(df, min_trades=MIN_TRADES, single_position=SINGLE_POSITION)
+        wf.run()
+        wf.print_summary()
+
+def report_instruments():
+    INSTRUMENTS.print_report()
+    if METRICS_BASENAME:
+        INSTRUMENTS.export(METRICS_BASENAME)
+        print(f"Stage timers written to '{METRICS_BASENAME}.json' / '.prom'.")
+    if PROFILER.running:
+        PROFILER.stop()
+        PROFILER.write_collapsed("profile.folded")
+        print("🔥 Hottest functions (main process):")
+        for fn, share in PROFILER.top(10):
+            print(f"  {share:6.1%}  {fn}")
 
 if __name__ == "__main__":
-    run_auto_pilot()
\ No newline at end of file
+    if PROFILE:
+        PROFILER.start()
+    try:
+        run_auto_pilot()
+    finally:
+        report_instruments()
\ No newline at end of file
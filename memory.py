@@ -0,0 +1,74 @@
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+def rss_mb():
+    """Current resident set size of this process in MB (0 where /proc is missing)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024   # KB on Linux
+    except (ImportError, AttributeError):
+        return rss_mb()
+
+
+class MemoryTracker:
+    """
+    Peak memory per pipeline stage.
+
+        tracker = MemoryTracker()
+        with tracker.stage("load"):
+            ...
+        tracker.print_report()
+
+    'peak' is the highest Python/NumPy allocation level (tracemalloc)
+    reached inside the stage, 'rss' the process RSS when it ended.
+    enabled=False makes stage() a no-op (tracemalloc slows every allocation).
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = tracemalloc.is_tracing()
+        if not started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        t0 = time.time()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            self.stages.append({
+                'stage': name,
+                'seconds': round(time.time() - t0, 2),
+                'peak_mb': round((peak - base) / 2**20, 1),
+                'retained_mb': round((current - base) / 2**20, 1),
+                'rss_mb': round(rss_mb(), 1),
+            })
+            if not started:
+                tracemalloc.stop()
+
+    def print_report(self):
+        print("\n" + "="*40)
+        print("🧠 MEMORY PER STAGE")
+        print("="*40)
+        for s in self.stages:
+            print(f"{s['stage']:<18}: peak +{s['peak_mb']} MB, kept +{s['retained_mb']} MB, "
+                  f"RSS {s['rss_mb']} MB ({s['seconds']}s)")
+        print("="*40 + "\n")
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from instrumentation import INSTRUMENTS
+
+METRIC_COLUMNS = [
+    'Total Trades', 'Total Profit ($)', 'Profit Factor', 'Win Rate (%)', 'Max Drawdown ($)',
+    'Avg Win ($)', 'Avg Loss ($)', 'Risk/Reward Ratio', 'Best Trade ($)', 'Worst Trade ($)',
+    'Max Consec. Wins', 'Max Consec. Losses', 'Avg Duration',
+]
+# Keys an empty backtest reports (see trade_metrics)
+EMPTY_COLUMNS = METRIC_COLUMNS[:3] + ['Max Drawdown ($)']
+
+
+def _segment_sum(values, segments, n):
+    return np.bincount(segments, weights=values, minlength=n)
+
+
+def _drawdowns(pnl, offsets, counts):
+    """Max drawdown of every backtest's cumulative PnL (pnl in exit order)."""
+    n = len(counts)
+    dd = np.zeros(n)
+    if not len(pnl):
+        return dd
+    # One row per backtest, padded after its last trade: row-wise cumsum is
+    # the same sequential sum a per-backtest cumsum would do.
+    positions = np.arange(len(pnl)) - np.repeat(offsets[:-1], counts)
+    rows = np.repeat(np.arange(n), counts)
+    padded = np.zeros((n, counts.max()))
+    padded[rows, positions] = pnl
+    equity = np.cumsum(padded, axis=1)
+    drawdown = equity - np.maximum.accumulate(equity, axis=1)
+    drawdown[np.arange(counts.max()) >= counts[:, None]] = 0.0
+    return drawdown.min(axis=1)
+
+
+def _streaks(win, segments, offsets, n):
+    """Longest runs of wins and of losses per backtest (win in exit order)."""
+    cons_wins = np.zeros(n, dtype=np.int64)
+    cons_losses = np.zeros(n, dtype=np.int64)
+    if not len(win):
+        return cons_wins, cons_losses
+    starts = np.ones(len(win), dtype=bool)
+    starts[1:] = win[1:] != win[:-1]
+    starts[offsets[:-1][np.diff(offsets) > 0]] = True
+    run_starts = np.flatnonzero(starts)
+    run_lengths = np.diff(np.append(run_starts, len(win)))
+    run_win = win[run_starts]
+    run_segments = segments[run_starts]
+    np.maximum.at(cons_wins, run_segments[run_win], run_lengths[run_win])
+    np.maximum.at(cons_losses, run_segments[~run_win], run_lengths[~run_win])
+    return cons_wins, cons_losses
+
+
+@INSTRUMENTS.timed('metrics')
+def batch_metrics(pnl, durations, exit_keys, offsets):
+    """
+    Trade metrics for many backtests at once.
+
+    pnl, durations, exit_keys: flat per-trade arrays, backtest after
+    backtest, each backtest's trades in entry order. durations is
+    timedelta64; exit_keys orders trades by exit (bar index or exit time).
+    offsets: start of every backtest in the flat arrays, plus the total
+    length at the end (len(offsets) = number of backtests + 1).
+
+    Returns a DataFrame with one row per backtest and METRIC_COLUMNS,
+    rounded like trade_metrics. Backtests without trades only fill
+    EMPTY_COLUMNS (zeros), the rest is NaN.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = len(offsets) - 1
+    counts = np.diff(offsets)
+    segments = np.repeat(np.arange(n), counts)
+    has = counts > 0
+
+    win = pnl > 0
+    n_wins = np.bincount(segments, weights=win, minlength=n)
+    n_losses = counts - n_wins
+    gross_win = _segment_sum(np.where(win, pnl, 0.0), segments, n)
+    loss_sum = _segment_sum(np.where(win, 0.0, pnl), segments, n)
+    gross_loss = np.abs(loss_sum)
+    total_profit = _segment_sum(pnl, segments, n)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit_factor = np.where(gross_loss > 0, gross_win / gross_loss, 999)
+        win_rate = n_wins / counts * 100
+        avg_win = np.where(n_wins > 0, gross_win / n_wins, 0.0)
+        avg_loss = np.where(n_losses > 0, loss_sum / n_losses, 0.0)
+        risk_reward = np.where(avg_loss != 0, np.abs(avg_win / avg_loss), 0.0)
+
+    best = np.full(n, np.nan)
+    worst = np.full(n, np.nan)
+    if has.any():
+        starts = offsets[:-1][has]
+        best[has] = np.maximum.reduceat(pnl, starts)
+        worst[has] = np.minimum.reduceat(pnl, starts)
+
+    durations = np.asarray(durations)
+    unit = durations.dtype if durations.dtype.kind == 'm' else np.dtype('m8[ns]')
+    total_duration = _segment_sum(durations.view(np.int64).astype(np.float64), segments, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_duration = total_duration / counts
+    avg_duration = np.array([str(pd.Timedelta(np.int64(d).astype(unit))).split('.')[0] if ok else np.nan
+                             for d, ok in zip(np.nan_to_num(mean_duration), has)], dtype=object)
+
+    # Drawdown and streaks follow exit order
+    order = np.lexsort((exit_keys, segments))
+    dd = _drawdowns(pnl[order], offsets, counts)
+    cons_wins, cons_losses = _streaks(win[order], segments, offsets, n)
+
+    rows = {
+        'Total Trades': counts,
+        'Total Profit ($)': np.round(total_profit, 2),
+        'Profit Factor': np.where(has, np.round(profit_factor, 2), 0),
+        'Win Rate (%)': np.where(has, np.round(win_rate, 2), np.nan),
+        'Max Drawdown ($)': np.round(dd, 2),
+        'Avg Win ($)': np.where(has, np.round(avg_win, 2), np.nan),
+        'Avg Loss ($)': np.where(has, np.round(avg_loss, 2), np.nan),
+        'Risk/Reward Ratio': np.where(has, np.round(risk_reward, 2), np.nan),
+        'Best Trade ($)': np.round(best, 2),
+        'Worst Trade ($)': np.round(worst, 2),
+        'Max Consec. Wins': cons_wins if has.all() else np.where(has, cons_wins, np.nan),
+        'Max Consec. Losses': cons_losses if has.all() else np.where(has, cons_losses, np.nan),
+        'Avg Duration': avg_duration,
+    }
+    return pd.DataFrame(rows, columns=METRIC_COLUMNS)
+
+
+def metrics_records(block):
+    """Per-backtest metrics dicts in the trade_metrics format."""
+    records = []
+    for row in block.to_dict('records'):
+        if row['Total Trades'] == 0:
+            records.append({k: 0 for k in EMPTY_COLUMNS})
+            continue
+        row['Total Trades'] = int(row['Total Trades'])
+        row['Max Consec. Wins'] = int(row['Max Consec. Wins'])
+        row['Max Consec. Losses'] = int(row['Max Consec. Losses'])
+        records.append(row)
+    return records
@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from trade_log import TradeLog
+from instrumentation import INSTRUMENTS
+
+METHODS = ('bootstrap', 'permute', 'skip')
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def trade_pnl(trades):
+    """PnL per trade in exit order from a TradeLog, a trade log DataFrame or an array."""
+    if isinstance(trades, TradeLog):
+        order = np.argsort(trades.records['exit_idx'], kind='stable')
+        return np.asarray(trades.pnl[order], dtype=np.float64)
+    if isinstance(trades, pd.DataFrame):
+        if trades.empty:
+            return np.empty(0)
+        return trades.sort_values('exit_time', kind='stable')['pnl_usd'].to_numpy(dtype=np.float64)
+    return np.asarray(trades, dtype=np.float64)
+
+def resample_paths(pnl, method, n_paths, rng, skip_prob=0.1):
+    """
+    (n_paths, n_trades) array of alternative trade sequences:
+      bootstrap - trades drawn with replacement
+      permute   - the same trades in random order (final profit unchanged)
+      skip      - the original order, each trade missed with skip_prob
+    """
+    n = len(pnl)
+    if method == 'bootstrap':
+        return pnl[rng.integers(0, n, size=(n_paths, n))]
+    if method == 'permute':
+        return rng.permuted(np.tile(pnl, (n_paths, 1)), axis=1)
+    if method == 'skip':
+        return np.where(rng.random((n_paths, n)) < skip_prob, 0.0, pnl)
+    raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+
+def path_stats(paths):
+    """(profit, max_drawdown) per path row, drawdown as in batch_metrics (<= 0). Reuses `paths`."""
+    equity = np.cumsum(paths, axis=1, out=paths)
+    profit = equity[:, -1].copy()
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.subtract(equity, peak, out=peak)
+    return profit, peak.min(axis=1)
+
+def simulate_chunk(pnl, method, n_paths, seed, skip_prob=0.1):
+    """One work unit: resamples n_paths paths and reduces them to per-path stats."""
+    rng = np.random.default_rng(seed)
+    return path_stats(resample_paths(pnl, method, n_paths, rng, skip_prob))
+
+
+class StreamingQuantiles:
+    """
+    Percentiles of a stream of values in fixed memory.
+    Values are counted in `bins` equal-width bins; when a value falls
+    outside the range, bins are merged pairwise and the range doubled, so
+    the error stays below one bin width (range / bins). Count, mean, std,
+    min and max are exact.
+    """
+    def __init__(self, bins=4096):
+        self.bins = bins + bins % 2
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.lo = None
+        self.width = None
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        vmin, vmax = values.min(), values.max()
+        if self.lo is None:
+            span = vmax - vmin
+            pad = span * 0.5 if span > 0 else max(abs(vmin), 1.0) * 1e-6
+            self.lo = vmin - pad
+            self.width = (span + 2 * pad) / self.bins
+        while vmin < self.lo:
+            self._grow(down=True)
+        while vmax >= self.lo + self.width * self.bins:
+            self._grow(down=False)
+
+        idx = np.clip(((values - self.lo) / self.width).astype(np.int64), 0, self.bins - 1)
+        self.counts += np.bincount(idx, minlength=self.bins)
+        self.n += len(values)
+        self.total += values.sum()
+        self.total_sq += np.square(values).sum()
+        self.min = min(self.min, vmin)
+        self.max = max(self.max, vmax)
+
+    def _grow(self, down):
+        merged = self.counts.reshape(-1, 2).sum(axis=1)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        half = self.bins // 2
+        if down:
+            # Old range becomes the upper half
+            self.counts[half:] = merged
+            self.lo -= self.width * self.bins
+        else:
+            self.counts[:half] = merged
+        self.width *= 2
+
+    def quantile(self, q):
+        q = np.asarray(q, dtype=np.float64)
+        if not self.n:
+            return np.full(q.shape, np.nan)
+        cum = np.cumsum(self.counts)
+        target = q * self.n
+        b = np.minimum(np.searchsorted(cum, target, side='left'), self.bins - 1)
+        before = cum[b] - self.counts[b]
+        frac = (target - before) / np.maximum(self.counts[b], 1)
+        return np.clip(self.lo + (b + frac) * self.width, self.min, self.max)
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else np.nan
+
+    @property
+    def std(self):
+        if not self.n:
+            return np.nan
+        return float(np.sqrt(max(self.total_sq / self.n - self.mean ** 2, 0.0)))
+
+    def summary(self):
+        row = {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, self.quantile(np.array(PERCENTILES) / 100))}
+        row.update({'mean': round(float(self.mean), 2), 'std': round(self.std, 2),
+                    'min': round(float(self.min), 2), 'max': round(float(self.max), 2)})
+        return row
+
+
+class MonteCarlo:
+    """
+    Robustness check of one trade history: many resampled trade sequences
+    (see resample_paths) and the distribution of their profit and max
+    drawdown.
+
+    Paths are generated as 2-D arrays in chunks of at most max_chunk_mb,
+    spread over n_jobs worker processes; each chunk only returns two
+    numbers per path, which stream into StreamingQuantiles, so memory
+    does not grow with n_paths. Chunks get independent seeds from `seed`:
+    results do not depend on n_jobs.
+    drawdown_limit: optional $ amount; reports the share of paths whose
+    drawdown goes beyond it.
+    """
+    def __init__(self, trades, n_paths=10_000, method='bootstrap', skip_prob=0.1, seed=42,
+                 n_jobs=-1, max_chunk_mb=64, drawdown_limit=None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+        self.pnl = trade_pnl(trades)
+        self.n_paths = n_paths
+        self.method = method
+        self.skip_prob = skip_prob
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.max_chunk_mb = max_chunk_mb
+        self.drawdown_limit = drawdown_limit
+        self.results = {}
+
+    def chunk_paths(self):
+        # Path array, its running peak and the bootstrap indices
+        per_path = len(self.pnl) * 8 * 3
+        return max(1, min(self.n_paths, int(self.max_chunk_mb * 2**20 // per_path)))
+
+    def run(self):
+        if not len(self.pnl):
+            raise ValueError("Monte Carlo needs at least one closed trade")
+        size = self.chunk_paths()
+        sizes = [min(size, self.n_paths - start) for start in range(0, self.n_paths, size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+
+        profit, drawdown = StreamingQuantiles(), StreamingQuantiles()
+        losing = breached = 0
+        with INSTRUMENTS.timer('monte_carlo', method=self.method):
+            outputs = Parallel(n_jobs=self.n_jobs, return_as='generator')(
+                delayed(simulate_chunk)(self.pnl, self.method, m, s, self.skip_prob)
+                for m, s in zip(sizes, seeds))
+            for chunk_profit, chunk_dd in outputs:
+                profit.add(chunk_profit)
+                drawdown.add(chunk_dd)
+                losing += int((chunk_profit < 0).sum())
+                if self.drawdown_limit is not None:
+                    breached += int((chunk_dd < -abs(self.drawdown_limit)).sum())
+
+        historical_profit, historical_dd = path_stats(self.pnl[None, :].copy())
+        self.results = {
+            'method': self.method,
+            'paths': self.n_paths,
+            'trades': len(self.pnl),
+            'historical': {'profit': round(float(historical_profit[0]), 2),
+                           'max_drawdown': round(float(historical_dd[0]), 2)},
+            'profit': profit.summary(),
+            'max_drawdown': drawdown.summary(),
+            'prob_loss (%)': round(losing / self.n_paths * 100, 2),
+        }
+        if self.drawdown_limit is not None:
+            self.results['prob_dd_breach (%)'] = round(breached / self.n_paths * 100, 2)
+        return self.results
+
+    def print_summary(self):
+        r = self.results
+        print("\n" + "="*40)
+        print(f"🎲 MONTE CARLO ({r['paths']:,} {r['method']} paths, {r['trades']} trades)")
+        print("="*40)
+        for key in ('profit', 'max_drawdown'):
+            row = r[key]
+            print(f"{key:<14}: historical {r['historical'][key]}, median {row['p50']}, "
+                  f"5%..95% [{row['p5']}, {row['p95']}], 1% tail {row['p1']}")
+        print(f"{'P(loss)':<14}: {r['prob_loss (%)']}%")
+        if 'prob_dd_breach (%)' in r:
+            print(f"{'P(DD > limit)':<14}: {r['prob_dd_breach (%)']}%")
+        print("="*40 + "\n")
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from instrumentation import INSTRUMENTS
+
+class TelegramSink:
+    """Delivers messages through telegram_notify.send_telegram_msg."""
+    def __init__(self, send_fn=None):
+        self.send_fn = send_fn
+
+    def __call__(self, msg):
+        if self.send_fn is None:
+            # Imported lazily so the live loop can run where Telegram is not configured
+            from telegram_notify import send_telegram_msg
+            self.send_fn = send_telegram_msg
+        with INSTRUMENTS.timer('telegram_send'):
+            return self.send_fn(msg)
+
+
+class StubSink:
+    """
+    Offline sink for tests: records delivered messages.
+    fail_times: number of initial calls that raise, to exercise retries.
+    delay: seconds each call blocks, to simulate a slow API.
+    """
+    def __init__(self, fail_times=0, delay=0.0):
+        self.fail_times = fail_times
+        self.delay = delay
+        self.calls = 0
+        self.messages = []
+
+    def __call__(self, msg):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.calls <= self.fail_times:
+            raise ConnectionError("stub sink failure")
+        self.messages.append(msg)
+        return True
+
+
+class Notifier:
+    """
+    Non-blocking notification queue.
+
+    send() only enqueues; a background thread delivers. Messages arriving
+    within `coalesce_window` seconds of each other are merged into one
+    (up to `max_length` chars), deliveries are spaced by `min_interval`,
+    and failures are retried with exponential backoff. When the bounded
+    queue is full the oldest pending message is dropped.
+    """
+    def __init__(self, sink, max_queue=100, min_interval=1.0, coalesce_window=0.5,
+                 max_retries=3, backoff=1.0, max_length=4000):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.min_interval = min_interval
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_length = max_length
+
+        self.stats = {'enqueued': 0, 'sent': 0, 'coalesced': 0, 'dropped': 0, 'failed': 0}
+        self.last_sent = 0.0
+        self.pending = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.closing = False
+
+    # --- Producer side (trading thread) ---
+    def send(self, msg):
+        if self.closing:
+            return
+        self._ensure_thread()
+        while True:
+            try:
+                self.queue.put_nowait(msg)
+                self.stats['enqueued'] += 1
+                INSTRUMENTS.count('notifications', status='enqueued')
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                    self.stats['dropped'] += 1
+                    INSTRUMENTS.count('notifications', status='dropped')
+                except queue.Empty:
+                    pass
+
+    def flush(self, timeout=None):
+        """Waits until everything enqueued so far was delivered (or given up)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=10.0):
+        done = self.flush(timeout)
+        self.closing = True
+        return done
+
+    def _ensure_thread(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+                self.thread.start()
+
+    # --- Consumer side (background thread) ---
+    def _run(self):
+        while True:
+            first = self.pending if self.pending is not None else self.queue.get()
+            self.pending = None
+            batch = [first]
+            length = len(first)
+
+            # Coalesce a burst into one message
+            deadline = time.time() + self.coalesce_window
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    msg = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if length + len(msg) + 2 > self.max_length:
+                    self.pending = msg
+                    break
+                batch.append(msg)
+                length += len(msg) + 2
+
+            self._deliver("\n\n".join(batch))
+            self.stats['coalesced'] += len(batch) - 1
+            for _ in batch:
+                self.queue.task_done()
+
+    def _deliver(self, text):
+        wait = self.last_sent + self.min_interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                ok = self.sink(text)
+                if ok is not False:
+                    self.stats['sent'] += 1
+                    INSTRUMENTS.count('notifications', status='sent')
+                    self.last_sent = time.time()
+                    return True
+            except Exception as e:
+                print(f"\n⚠️ Notification failed ({attempt + 1}/{self.max_retries + 1}): {e}")
+            if attempt < self.max_retries:
+                time.sleep(delay)
+                delay *= 2
+        self.stats['failed'] += 1
+        INSTRUMENTS.count('notifications', status='failed')
+        self.last_sent = time.time()
+        return False
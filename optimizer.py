@@ -1,12 +1,20 @@
+import os
 import pandas as pd
 import numpy as np
 import itertools
-from joblib import Parallel, delayed
+from contextlib import ExitStack
+from joblib import Parallel, delayed, cpu_count
 from backtester import Backtester
+from indicators import IndicatorBank
+from shared_data import SharedDataset, attach
+from result_store import param_hash
+from metrics import METRIC_COLUMNS
+from memory import peak_rss_mb
+from instrumentation import INSTRUMENTS, worker_throughput
 
-def run_single_backtest_task(df, params):
+def run_single_backtest_task(df, params, bank=None, single_position=False):
     try:
-        bot = Backtester(df, params=params)
+        bot = Backtester(df, params=params, bank=bank, single_position=single_position)
         metrics = bot.run_backtest()
         
         metrics.update(params)
@@ -14,16 +22,111 @@ def run_single_backtest_task(df, params):
     except Exception as e:
         return None
 
+def run_signal_group_task(df, signal_params, exit_variants, bank=None, window=None, prune=None,
+                          single_position=False):
+    """
+    Generates entries once and evaluates all exit variants in one batch.
+    window: optional (start, end, exit_limit) slice of the data.
+    prune: optional {'min_trades', 'max_drawdown'}; pruned variants are dropped.
+    Returns a metrics block: one row per variant, metrics + param columns,
+    or None if the backtest failed.
+    """
+    try:
+        bot = Backtester(df, params=signal_params, bank=bank, single_position=single_position)
+        if window is None:
+            block = bot.run_exit_variants(exit_variants, as_frame=True, **(prune or {}))
+        else:
+            block = bot.run_exit_variants(exit_variants, windows=[window], as_frame=True, **(prune or {}))[0]
+        
+        for key, value in signal_params.items():
+            block.insert(len(METRIC_COLUMNS) + list(signal_params).index(key), key, value)
+        return block
+    except Exception as e:
+        print(f"⚠️ Backtest failed for {signal_params}: {type(e).__name__}: {e}")
+        return None
+
+def run_group_chunk(df, groups, bank=None, window=None, prune=None, single_position=False):
+    """
+    Runs a chunk of signal groups against one shared IndicatorBank.
+    The stats carry the worker's stage timers ('instruments'), drained so
+    the parent can merge them without double counting, and the positions
+    of groups whose backtest failed ('failed'): their missing rows were
+    not pruned.
+    """
+    worker = os.getpid()
+    with INSTRUMENTS.timer('worker_chunk', worker=worker):
+        bank = bank or IndicatorBank(df)
+        hits, misses = bank.hits, bank.misses
+        blocks, failed = [], []
+        for j, (signal_params, exit_variants) in enumerate(groups):
+            block = run_signal_group_task(df, signal_params, exit_variants, bank, window, prune, single_position)
+            if block is None:
+                failed.append(j)
+            elif not block.empty:
+                blocks.append(block)
+        results = pd.concat(blocks, ignore_index=True) if blocks else pd.DataFrame()
+    INSTRUMENTS.count('worker_combos', sum(len(variants) for _, variants in groups), worker=worker)
+    return results, {'hits': bank.hits - hits, 'misses': bank.misses - misses,
+                     'cache_mb': bank.nbytes() / 2**20, 'peak_rss_mb': peak_rss_mb(),
+                     'failed': failed, 'instruments': INSTRUMENTS.drain()}
+
+def run_group_chunk_shared(handle, groups, window=None, prune=None, single_position=False):
+    """Same as run_group_chunk, but attaches to a SharedDataset by name."""
+    df, bank = attach(handle)
+    return run_group_chunk(df, groups, bank, window, prune, single_position)
+
+EXIT_KEYS = ('sl_multiplier', 'tp_multiplier', 'be_multiplier')
+
+def group_by_signal_params(combinations):
+    """
+    Groups combinations by the parameters that affect entry signals.
+    Returns a list of (signal_params, [exit_params, ...]) in first-seen order.
+    """
+    groups = {}
+    for params in combinations:
+        signal_params = {k: v for k, v in params.items() if k not in EXIT_KEYS}
+        exit_params = {k: v for k, v in params.items() if k in EXIT_KEYS}
+        key = tuple(signal_params.items())
+        if key not in groups:
+            groups[key] = (signal_params, [])
+        groups[key][1].append(exit_params)
+    return list(groups.values())
+
 class Optimizer:
-    def __init__(self, df):
+    """
+    shared_memory: publish the dataset once as memory-mapped columns and let
+                   workers attach by name instead of pickling it per task.
+    n_chunks: number of work units the signal groups are split into.
+    min_trades / max_drawdown: combinations that provably miss the trade
+                   floor or breach the drawdown cap ($) are cut short and
+                   left out of the results.
+    store: optional ResultStore; finished chunks are persisted as they
+           come in and combinations already in the store are skipped.
+           Results are kept per single_position setting.
+    frames: optional {timeframe: DataFrame} (e.g. DataLoad.resample); adds
+           'timeframe' as a grid dimension. Each frame is published once
+           and every combination runs on the frame of its timeframe.
+    single_position: backtest one trade at a time (live semantics).
+    backend: optional distributed.FileQueueBackend; chunks then run on the
+           queue's workers (other processes or hosts) instead of joblib.
+    """
+    def __init__(self, df, n_chunks=None, shared_memory=True, min_trades=None, max_drawdown=None,
+                 store=None, frames=None, single_position=False, backend=None):
         self.df = df
+        self.backend = backend
+        self.single_position = single_position
+        self.frames = frames
+        self.n_chunks = n_chunks
+        self.shared_memory = shared_memory
+        self.prune = {'min_trades': min_trades, 'max_drawdown': max_drawdown}
+        self.store = store
 
     def get_monster_grid(self):
         """
          numpy ranges.
 
         """
-        return {
+        grid = {
             'sma_fast': list(range(5, 50, 5)), 
             'sma_slow': list(range(50, 160, 10)), 
             'sma_trend': [200], 
@@ -35,6 +138,12 @@ class Optimizer:
             'tp_multiplier': [round(x, 1) for x in np.arange(2.0, 7.5, 0.5)],
             'be_multiplier': [1.5, 100.0] 
         }
+        if self.frames:
+            grid['timeframe'] = list(self.frames)
+        return grid
+
+    def _frame(self, timeframe):
+        return self.df if timeframe is None else self.frames[timeframe]
 
     def optimize(self):
         param_grid = self.get_monster_grid()
@@ -48,12 +157,99 @@ class Optimizer:
         print(f"This allows us to find the EXACT best parameters.")
         print("Processing... (Please wait)\n")
         
-        results = Parallel(n_jobs=-1, verbose=1)(
-            delayed(run_single_backtest_task)(self.df, params) 
-            for params in combinations
-        )
+        todo = combinations
+        if self.store is not None:
+            self.store.use_settings(self.single_position)
+            done = self.store.done(combinations, self.prune)
+            todo = [c for c in combinations if param_hash(c) not in done]
+            print(f"Result store: {total - len(todo):,} already done, {len(todo):,} to run.")
+
+        # SL/TP/BE do not change the entries: run signals once per group
+        # and batch the exit variants.
+        groups = group_by_signal_params(todo)
+        print(f"Signal groups: {len(groups):,} (x{len(todo) // max(len(groups), 1)} exit variants each)")
+
+        # Neighbouring groups share most indicator periods, so each
+        # chunk computes them once in its own IndicatorBank.
+        n_chunks = self.n_chunks or (cpu_count() * 4)
+        chunk_size = max(1, -(-len(groups) // n_chunks))
+        if self.store is not None:
+            # Small chunks: an interrupted run loses little work
+            chunk_size = min(chunk_size, 4)
+        # A chunk never mixes timeframes: it runs against one frame
+        by_timeframe = {}
+        for group in groups:
+            by_timeframe.setdefault(group[0].get('timeframe'), []).append(group)
+        chunks, timeframes = [], []
+        for timeframe, tf_groups in by_timeframe.items():
+            for i in range(0, len(tf_groups), chunk_size):
+                chunks.append(tf_groups[i:i + chunk_size])
+                timeframes.append(timeframe)
+
+        if self.backend is not None:
+            outputs = self._collect(chunks, keys, self.backend.run(
+                {tf: self._frame(tf) for tf in by_timeframe}, list(zip(timeframes, chunks)),
+                self.prune, self.single_position))
+        elif self.shared_memory:
+            with ExitStack() as stack:
+                handles = {tf: stack.enter_context(SharedDataset(self._frame(tf))).handle
+                           for tf in by_timeframe}
+                outputs = self._collect(chunks, keys, enumerate(Parallel(n_jobs=-1, verbose=1, return_as='generator')(
+                    delayed(run_group_chunk_shared)(handles[tf], chunk, prune=self.prune,
+                                                    single_position=self.single_position)
+                    for tf, chunk in zip(timeframes, chunks)
+                )))
+        else:
+            outputs = self._collect(chunks, keys, enumerate(Parallel(n_jobs=-1, verbose=1, return_as='generator')(
+                delayed(run_group_chunk)(self._frame(tf), chunk, prune=self.prune,
+                                         single_position=self.single_position)
+                for tf, chunk in zip(timeframes, chunks)
+            )))
         
-        clean_results = [r for r in results if r is not None]
+        blocks = [block for block, _ in outputs if not block.empty]
+        results = pd.concat(blocks, ignore_index=True) if blocks else pd.DataFrame()
+        if not results.empty:
+            # Same columns as the per-combination path: metrics, then params in grid order
+            results = results[list(METRIC_COLUMNS) + list(keys)]
+        hits = sum(stats['hits'] for _, stats in outputs)
+        misses = sum(stats['misses'] for _, stats in outputs)
+        self.cache_stats = {'hits': hits, 'misses': misses}
+        self.worker_peak_mb = max([stats['peak_rss_mb'] for _, stats in outputs], default=0.0)
+        failed = sum(len(chunk[j][1]) for chunk, (_, stats) in zip(chunks, outputs) for j in stats['failed'])
+        snapshots = [stats.get('instruments') for _, stats in outputs]
+        for snapshot in snapshots:
+            INSTRUMENTS.merge(snapshot)
+        self.worker_throughput = worker_throughput(snapshots)
         
-        print(f"\n--- Finished! Analyzed {len(clean_results)} strategies. ---")
-        return pd.DataFrame(clean_results)
\ No newline at end of file
+        print(f"\n--- Finished! Analyzed {len(results)} strategies. ---")
+        if failed:
+            print(f"⚠️ Failed (not stored, rerun to retry): {failed:,}")
+        if len(todo) - failed > len(results):
+            print(f"Pruned early (trade floor / drawdown cap): {len(todo) - failed - len(results):,}")
+        print(f"Indicator cache: {hits:,} hits / {misses:,} misses")
+        print(f"Worker peak RSS: {self.worker_peak_mb:.0f} MB")
+        for worker, rate in self.worker_throughput.items():
+            print(f"Worker {worker}: {rate:,.1f} combos/s")
+        if self.store is not None:
+            return self.store.load(combinations)
+        return results
+
+    def _collect(self, chunks, keys, outputs):
+        """
+        Consumes (chunk index, output) pairs as they arrive, persisting each
+        one; returns the outputs in chunk order. Combinations missing from a
+        block are stored as pruned, except those of failed groups.
+        """
+        collected = {}
+        for i, (block, stats) in outputs:
+            if self.store is not None:
+                rows = block.to_dict('records')
+                returned = {param_hash({k: row[k] for k in keys}) for row in rows}
+                failed = set(stats['failed'])
+                pruned = [{**signal_params, **exit_params}
+                          for j, (signal_params, exit_variants) in enumerate(chunks[i]) if j not in failed
+                          for exit_params in exit_variants]
+                pruned = [p for p in pruned if param_hash(p) not in returned]
+                self.store.save(rows, keys, pruned, self.prune)
+            collected[i] = (block, stats)
+        return [collected[i] for i in sorted(collected)]
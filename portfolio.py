@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from data_loader import DataLoad
+from backtester import Backtester, print_summary
+from metrics import batch_metrics, metrics_records
+from strategy import DEFAULT_PARAMS
+
+PARAMS_FILE = "best_params.json"
+
+def symbol_from_path(path):
+    """'data/EURUSD-365D-1H.csv' -> 'EURUSD' (same rule as replay.py)."""
+    return os.path.basename(path).split('-')[0].split('.')[0]
+
+def run_symbol_task(symbol, data, params, position_size=1000, low_memory=False, single_position=False):
+    """
+    Backtests one symbol. `data` is a CSV path (loaded in the worker, so
+    frames are never pickled) or a DataLoad frame. Returns the closed
+    trades as plain arrays.
+    """
+    if isinstance(data, str):
+        loader = DataLoad(data, low_memory=low_memory)
+        df = loader.process_data()
+        timeframe = params.get('timeframe')
+        if timeframe and timeframe != loader.base_timeframe():
+            df = loader.resample(timeframe)
+    else:
+        df = data
+    bot = Backtester(df, params=params, position_size=position_size, single_position=single_position)
+    bot.run_backtest()
+    r = bot.trades.records
+    datetimes = bot.trades.datetimes
+    return {
+        'symbol': symbol,
+        'bars': len(df),
+        'entry_time': datetimes[r['entry_idx']],
+        'exit_time': datetimes[r['exit_idx']],
+        'side': r['side'],
+        'entry_price': r['entry_price'],
+        'exit_price': r['exit_price'],
+        'pnl_usd': r['pnl_usd'],
+        # Gross notional held while the trade is open (quote currency)
+        'notional': r['entry_price'] * position_size,
+    }
+
+
+class PortfolioBacktester:
+    """
+    Backtests several symbols as one account.
+
+    symbols: list of dicts
+        {'symbol': 'EURUSD', 'data': 'data/EURUSD-365D-1H.csv' or a DataFrame,
+         'params': {...} or 'params_file': '...', 'position_size': 1000}
+    Symbols run in parallel (one joblib task each). Their entries and
+    exits are then merged on one timeline by a single sort of all trade
+    events (exits before entries at the same timestamp), and cumulative
+    sums give the portfolio's realized equity, open positions and gross
+    exposure at every event. Drawdown is measured on realized equity, like
+    the single-symbol 'Max Drawdown ($)'. PnL is taken as USD for every
+    symbol (no currency conversion).
+    single_position: at most one open trade per symbol, as the live bot
+    trades (one position per magic number).
+    """
+    def __init__(self, symbols, initial_capital=10000.0, n_jobs=-1, low_memory=False, single_position=False):
+        self.symbols = [self._config(s) for s in symbols]
+        names = [s['symbol'] for s in self.symbols]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate symbols in portfolio: {names}")
+        self.initial_capital = initial_capital
+        self.n_jobs = n_jobs
+        self.low_memory = low_memory
+        self.single_position = single_position
+        self.trades = pd.DataFrame()
+        self.equity = pd.DataFrame()
+        self.symbol_metrics = pd.DataFrame()
+        self.metrics = {}
+
+    @staticmethod
+    def _config(entry):
+        params = DEFAULT_PARAMS.copy()
+        if 'params' in entry:
+            params.update(entry['params'])
+        elif entry.get('params_file'):
+            with open(entry['params_file']) as f:
+                params.update(json.load(f))
+        symbol = entry.get('symbol') or symbol_from_path(entry['data'])
+        return {'symbol': symbol, 'data': entry['data'], 'params': params,
+                'position_size': entry.get('position_size', 1000)}
+
+    def run(self):
+        outputs = Parallel(n_jobs=self.n_jobs)(
+            delayed(run_symbol_task)(s['symbol'], s['data'], s['params'], s['position_size'],
+                                     self.low_memory, self.single_position)
+            for s in self.symbols)
+
+        self.trades = self._merge_trades(outputs)
+        self.symbol_metrics = self._symbol_metrics(outputs)
+        self.equity = self._timeline(self.trades)
+        return self.calculate_metrics()
+
+    # --- Merging ---
+    @staticmethod
+    def _merge_trades(outputs):
+        """All closed trades in exit order (ties keep entry time, then symbol order)."""
+        counts = [len(o['pnl_usd']) for o in outputs]
+        if not sum(counts):
+            return pd.DataFrame()
+        cols = ('entry_time', 'exit_time', 'side', 'entry_price', 'exit_price', 'pnl_usd', 'notional')
+        merged = {c: np.concatenate([o[c] for o in outputs]) for c in cols}
+        symbol_id = np.repeat(np.arange(len(outputs)), counts)
+        order = np.lexsort((symbol_id, merged['entry_time'], merged['exit_time']))
+
+        names = pd.Categorical.from_codes(symbol_id[order], [o['symbol'] for o in outputs])
+        trades = pd.DataFrame({'symbol': names, **{c: v[order] for c, v in merged.items()}})
+        trades.insert(3, 'trade_type', np.where(trades['side'] == 1, 'Long', 'Short').astype(object))
+        trades['duration'] = trades['exit_time'] - trades['entry_time']
+        return trades.drop(columns='side')
+
+    def _timeline(self, trades):
+        """
+        Portfolio state after every entry/exit event: realized equity,
+        open positions, gross exposure and drawdown.
+        """
+        if trades.empty:
+            return pd.DataFrame(columns=['equity', 'open_positions', 'gross_exposure', 'drawdown'])
+        n = len(trades)
+        times = np.concatenate([trades['entry_time'].values, trades['exit_time'].values])
+        # Exits (0) sort before entries (1) on the same bar
+        kind = np.repeat(np.array([1, 0], dtype=np.int8), n)
+        pnl = np.concatenate([np.zeros(n), trades['pnl_usd'].values])
+        positions = np.repeat(np.array([1, -1]), n)
+        notional = trades['notional'].values
+        exposure = np.concatenate([notional, -notional])
+
+        order = np.lexsort((kind, times))
+        equity = self.initial_capital + np.cumsum(pnl[order])
+        timeline = pd.DataFrame({
+            'equity': equity,
+            'open_positions': np.cumsum(positions[order]),
+            'gross_exposure': np.cumsum(exposure[order]),
+            'drawdown': equity - np.maximum.accumulate(np.r_[self.initial_capital, equity])[1:],
+        }, index=pd.DatetimeIndex(times[order], name='Datetime'))
+        # One row per timestamp: the state after all of its events
+        return timeline[~timeline.index.duplicated(keep='last')]
+
+    @staticmethod
+    def _symbol_metrics(outputs):
+        """Standard metrics per symbol, all symbols in one batch_metrics call."""
+        offsets = np.concatenate(([0], np.cumsum([len(o['pnl_usd']) for o in outputs]))).astype(np.int64)
+        block = batch_metrics(
+            np.concatenate([o['pnl_usd'] for o in outputs]),
+            np.concatenate([o['exit_time'] - o['entry_time'] for o in outputs]),
+            np.concatenate([o['exit_time'] for o in outputs]), offsets)
+        block.insert(0, 'Symbol', [o['symbol'] for o in outputs])
+        return block
+
+    # --- Results ---
+    def calculate_metrics(self):
+        trades = self.trades
+        if trades.empty:
+            self.metrics = metrics_records(batch_metrics([], np.array([], dtype='m8[ns]'), [], [0, 0]))[0]
+            return self.metrics
+        block = batch_metrics(trades['pnl_usd'].values, trades['duration'].values,
+                              trades['exit_time'].values, [0, len(trades)])
+        metrics = metrics_records(block)[0]
+
+        eq = self.equity
+        peak = np.maximum.accumulate(np.r_[self.initial_capital, eq['equity'].values])[1:]
+        span = eq.index.values[-1] - eq.index.values[0]
+        # Time-weighted mean of open positions between events
+        held = np.diff(eq.index.values).astype(np.float64)
+        avg_open = (eq['open_positions'].values[:-1] * held).sum() / held.sum() if held.sum() else 0.0
+
+        metrics.update({
+            'Symbols': len(self.symbols),
+            'Max Drawdown (%)': round(float((eq['drawdown'].values / peak).min() * 100), 2),
+            'Return (%)': round(float(trades['pnl_usd'].sum() / self.initial_capital * 100), 2),
+            'Max Open Positions': int(eq['open_positions'].max()),
+            'Avg Open Positions': round(float(avg_open), 2),
+            'Max Gross Exposure': round(float(eq['gross_exposure'].max()), 2),
+            'Time in Market (%)': round(float(held[eq['open_positions'].values[:-1] > 0].sum() / held.sum() * 100), 2)
+                                  if held.sum() else 0.0,
+            'Period': str(pd.Timedelta(span)).split('.')[0],
+        })
+        self.metrics = metrics
+        return metrics
+
+    def print_summary(self):
+        if not self.symbol_metrics.empty:
+            cols = ['Symbol', 'Total Trades', 'Total Profit ($)', 'Profit Factor', 'Win Rate (%)', 'Max Drawdown ($)']
+            print("\n" + self.symbol_metrics[cols].to_string(index=False))
+        print_summary(self.metrics, title=f"💼 PORTFOLIO REPORT ({len(self.symbols)} symbols)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest several symbols as one portfolio.")
+    parser.add_argument("files", nargs="*", help="MT5 CSV exports, e.g. data/EURUSD-365D-1H.csv")
+    parser.add_argument("--config", help="JSON list of {symbol, data, params_file, position_size}")
+    parser.add_argument("--params-file", default=PARAMS_FILE, help="parameters for the plain file arguments")
+    parser.add_argument("--capital", type=float, default=10000.0)
+    parser.add_argument("--single-position", action="store_true", help="one open trade per symbol, like the live bot")
+    args = parser.parse_args()
+
+    symbols = []
+    if args.config:
+        with open(args.config) as f:
+            symbols = json.load(f)
+    symbols += [{'data': path, 'params_file': args.params_file if os.path.exists(args.params_file) else None}
+                for path in args.files]
+    if not symbols:
+        parser.error("give CSV files and/or --config")
+
+    portfolio = PortfolioBacktester(symbols, initial_capital=args.capital, single_position=args.single_position)
+    portfolio.run()
+    portfolio.print_summary()
@@ -0,0 +1,130 @@
+import hashlib
+import importlib.util
+import json
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+
+# Modules whose code changes what a stored row holds: the bars and
+# sessions (data_loader), the backtest itself and how optimizer shapes the
+# rows. By name, because optimizer imports this module.
+RESULT_MODULES = ('data_loader', 'strategy', 'indicators', 'exit_engine', 'backtester', 'trade_log',
+                  'metrics', 'optimizer')
+
+def dataset_fingerprint(df):
+    """Hash of the bars a backtest sees (index + price/High/Low)."""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(df.index.values).tobytes())
+    for col in ('price', 'High', 'Low'):
+        h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()[:16]
+
+def code_version():
+    h = hashlib.sha1()
+    for name in RESULT_MODULES:
+        with open(importlib.util.find_spec(name).origin, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+def param_hash(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class ResultStore:
+    """
+    SQLite store of optimization results keyed by
+    (dataset fingerprint, code version, parameter hash).
+
+    Rows are committed as soon as a chunk finishes, so an interrupted run
+    resumes where it stopped, and a wider grid only runs the new
+    combinations. Combinations pruned early are remembered together with
+    the pruning settings, so they are skipped only under the same settings.
+    Single-position results are a separate set (see use_settings); the
+    Optimizer selects the set that matches its own settings.
+    """
+    def __init__(self, df, path="results.db", code=None, single_position=False):
+        self.path = path
+        self.dataset = dataset_fingerprint(df)
+        self.base_code = code or code_version()
+        self.use_settings(single_position)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                dataset TEXT, code TEXT, param_hash TEXT,
+                params TEXT, metrics TEXT, trades INTEGER, profit REAL,
+                pruned TEXT, created REAL,
+                PRIMARY KEY (dataset, code, param_hash))""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_profit ON results (dataset, code, profit)")
+        self.conn.commit()
+
+    def use_settings(self, single_position=False):
+        """Reads and writes the results of this backtest mode from now on (part of the code key)."""
+        self.single_position = single_position
+        self.code = self.base_code + ("-single" if single_position else "")
+
+    def close(self):
+        self.conn.close()
+
+    def done(self, combinations, prune=None):
+        """Hashes of the combinations that need no re-run."""
+        prune_key = json.dumps(prune or {}, sort_keys=True)
+        rows = self.conn.execute(
+            "SELECT param_hash, pruned FROM results WHERE dataset = ? AND code = ?",
+            (self.dataset, self.code))
+        stored = {h for h, pruned in rows if pruned is None or pruned == prune_key}
+        return {param_hash(c) for c in combinations} & stored
+
+    def save(self, rows, keys, pruned=(), prune=None):
+        """
+        rows: optimizer result dicts (metrics + params); `keys` names the params.
+        pruned: param dicts that were cut short under `prune`.
+        """
+        now = time.time()
+        prune_key = json.dumps(prune or {}, sort_keys=True)
+        records = []
+        for row in rows:
+            params = {k: row[k] for k in keys}
+            metrics = {k: v for k, v in row.items() if k not in keys}
+            records.append((self.dataset, self.code, param_hash(params), json.dumps(params),
+                            json.dumps(metrics, default=float), metrics['Total Trades'],
+                            metrics['Total Profit ($)'], None, now))
+        for params in pruned:
+            records.append((self.dataset, self.code, param_hash(params), json.dumps(params),
+                            None, None, None, prune_key, now))
+        self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+        self.conn.commit()
+
+    def _frame(self, rows):
+        return pd.DataFrame([{**json.loads(metrics), **json.loads(params)} for params, metrics in rows])
+
+    def load(self, combinations=None):
+        """Stored results (optionally only for `combinations`) as an optimizer DataFrame."""
+        rows = self.conn.execute(
+            "SELECT param_hash, params, metrics FROM results "
+            "WHERE dataset = ? AND code = ? AND metrics IS NOT NULL ORDER BY rowid",
+            (self.dataset, self.code))
+        if combinations is not None:
+            wanted = {param_hash(c) for c in combinations}
+            rows = [(p, m) for h, p, m in rows if h in wanted]
+        else:
+            rows = [(p, m) for _, p, m in rows]
+        return self._frame(rows)
+
+    def top(self, n=10, min_trades=0, objective='Total Profit ($)'):
+        """Best n results, ranked inside SQLite."""
+        if objective == 'Total Profit ($)':
+            order = "profit"
+        else:
+            order = f"json_extract(metrics, '$.\"{objective}\"')"
+        rows = self.conn.execute(
+            f"SELECT params, metrics FROM results WHERE dataset = ? AND code = ? "
+            f"AND metrics IS NOT NULL AND trades >= ? ORDER BY {order} DESC LIMIT ?",
+            (self.dataset, self.code, min_trades, n)).fetchall()
+        return self._frame(rows)
+
+    def count(self):
+        return self.conn.execute(
+            "SELECT COUNT(*), COUNT(metrics) FROM results WHERE dataset = ? AND code = ?",
+            (self.dataset, self.code)).fetchone()
@@ -0,0 +1,175 @@
+import heapq
+import json
+import time
+from collections import deque
+
+class ServerClock:
+    """
+    Tracks the offset between the broker's server clock and the local clock.
+    server_now ~= local_now + offset.
+    Samples come from tick timestamps; a stale tick (e.g. quiet market) can
+    only under-estimate the offset, so the max of recent samples is used.
+    """
+    def __init__(self, window=20):
+        self.samples = deque(maxlen=window)
+
+    def add_sample(self, server_time, local_time=None):
+        local_time = time.time() if local_time is None else local_time
+        self.samples.append(server_time - local_time)
+
+    @property
+    def offset(self):
+        return max(self.samples) if self.samples else 0.0
+
+    def server_now(self):
+        return time.time() + self.offset
+
+    def to_local(self, server_time):
+        return server_time - self.offset
+
+
+class _Job:
+    def __init__(self, name, fn, interval, align, grace, server_aligned, error_retry=None):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.align = align
+        self.grace = grace
+        self.server_aligned = server_aligned
+        self.error_retry = error_retry
+        self.runs = 0
+
+
+class Scheduler:
+    """
+    Minimal timer loop for the live bot.
+
+    every():            fixed-interval jobs on the local clock (optionally
+                        aligned to multiples of the interval, e.g. XX:00).
+    every_bar_close():  jobs aligned to bar closes on the *server* clock,
+                        fired `grace` seconds after the close.
+
+    A job may return a number of seconds to be retried sooner (e.g. the new
+    bar is not published yet); exceptions go to on_error and the job stays
+    scheduled, `error_retry` seconds later if set, else at its next slot.
+    run_now: first run right away instead of at the first slot.
+    """
+    def __init__(self, clock=None, on_error=None):
+        self.clock = clock or ServerClock()
+        self.on_error = on_error
+        self.queue = []
+        self.counter = 0
+        self.running = False
+
+    def every(self, name, interval, fn, align=False, run_now=False, error_retry=None):
+        job = _Job(name, fn, interval, align, 0.0, server_aligned=False, error_retry=error_retry)
+        due = time.time() if run_now else self._next_due(job)
+        self._push(due, job)
+        return job
+
+    def every_bar_close(self, name, timeframe_seconds, fn, grace=1.0, run_now=False, error_retry=None):
+        job = _Job(name, fn, timeframe_seconds, True, grace, server_aligned=True, error_retry=error_retry)
+        due = time.time() if run_now else self._next_due(job)
+        self._push(due, job)
+        return job
+
+    def _next_due(self, job):
+        now = time.time()
+        if job.server_aligned:
+            server_now = self.clock.server_now()
+            next_close = (server_now // job.interval + 1) * job.interval
+            return self.clock.to_local(next_close) + job.grace
+        if job.align:
+            return (now // job.interval + 1) * job.interval
+        return now + job.interval
+
+    def _push(self, due, job):
+        self.counter += 1
+        heapq.heappush(self.queue, (due, self.counter, job))
+
+    def run_pending(self):
+        """Runs every job that is due; returns seconds until the next one."""
+        while self.queue and self.queue[0][0] <= time.time():
+            _, _, job = heapq.heappop(self.queue)
+            retry = None
+            try:
+                retry = job.fn()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(job.name, e)
+                else:
+                    raise
+                retry = job.error_retry
+            job.runs += 1
+            if isinstance(retry, (int, float)) and not isinstance(retry, bool):
+                self._push(time.time() + retry, job)
+            else:
+                self._push(self._next_due(job), job)
+        if not self.queue:
+            return None
+        return max(0.0, self.queue[0][0] - time.time())
+
+    def run(self):
+        self.running = True
+        while self.running:
+            wait = self.run_pending()
+            if wait is None:
+                break
+            time.sleep(wait)
+
+    def stop(self):
+        self.running = False
+
+
+class Decision:
+    """Timestamps of one bar's decision, relative to the bar close."""
+    def __init__(self, bar_time, bar_close_local):
+        self.bar_time = bar_time
+        self.bar_close_local = bar_close_local
+        self.marks = {}
+        self.info = {}
+
+    def mark(self, stage):
+        self.marks[stage] = time.time()
+
+    def latencies_ms(self):
+        return {stage: round((t - self.bar_close_local) * 1000, 1) for stage, t in self.marks.items()}
+
+
+class LatencyTracker:
+    """
+    Records bar-close -> signal -> order_send latency for every decision.
+    Keeps the most recent decisions in memory and appends each one as a JSON
+    line to `log_file` (if given).
+    """
+    def __init__(self, log_file=None, keep=1000):
+        self.log_file = log_file
+        self.decisions = deque(maxlen=keep)
+
+    def start(self, bar_time, bar_close_local):
+        return Decision(bar_time, bar_close_local)
+
+    def finish(self, decision, **info):
+        decision.info.update(info)
+        self.decisions.append(decision)
+        if self.log_file:
+            record = {'bar_time': str(decision.bar_time), **decision.latencies_ms(), **decision.info}
+            with open(self.log_file, 'a') as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def summary(self):
+        """p50 / p95 / max latency (ms) per stage over the kept decisions."""
+        stages = {}
+        for d in self.decisions:
+            for stage, ms in d.latencies_ms().items():
+                stages.setdefault(stage, []).append(ms)
+        out = {}
+        for stage, values in stages.items():
+            values = sorted(values)
+            out[stage] = {
+                'p50': values[len(values) // 2],
+                'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max': values[-1],
+                'count': len(values),
+            }
+        return out
@@ -0,0 +1,226 @@
+import itertools
+import math
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, cpu_count
+from optimizer import Optimizer, group_by_signal_params, run_group_chunk_shared
+from instrumentation import INSTRUMENTS
+from shared_data import SharedDataset
+
+class AdaptiveSearch:
+    """
+    Budgeted alternatives to the exhaustive grid of Optimizer.optimize().
+
+    method: 'halving'  successive halving: every candidate on a short slice
+                       of history, the best 1/eta on a longer one, ... and
+                       the finalists on the full data.
+            'zoom'     coarse-to-fine: a sparse grid, then denser grids
+                       around the current leaders.
+            'guided'   random start, then candidates picked by a
+                       nearest-neighbour model of the scores seen so far.
+    max_evals / max_seconds: budget (combinations evaluated / wall time);
+            the search stops at whichever comes first.
+    min_trades / max_drawdown: combinations that provably miss the trade
+            floor or breach the drawdown cap ($) are cut short in the
+            backtester and never ranked.
+    single_position: backtest one trade at a time (live semantics).
+    """
+    def __init__(self, df, method='halving', param_grid=None, min_trades=30, max_drawdown=None,
+                 objective='Total Profit ($)', max_evals=None, max_seconds=None,
+                 eta=3, rungs=3, top_k=3, batch_size=256, n_chunks=None, seed=42, single_position=False):
+        self.df = df
+        self.single_position = single_position
+        self.method = method
+        self.param_grid = param_grid or Optimizer(df).get_monster_grid()
+        self.keys = list(self.param_grid)
+        self.sizes = [len(self.param_grid[k]) for k in self.keys]
+        self.grid_size = int(np.prod(self.sizes))
+        self.min_trades = min_trades
+        self.max_drawdown = max_drawdown
+        self.objective = objective
+        self.max_evals = max_evals
+        self.max_seconds = max_seconds
+        self.eta = eta
+        self.rungs = rungs
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.n_chunks = n_chunks
+        self.rng = np.random.default_rng(seed)
+
+        self.evals = 0
+        self.scores = {}     # (point, fraction) -> score, -inf if pruned/invalid
+        self.rows = {}       # point -> full-data metrics row
+        self.handle = None
+
+    # --- Budget ---
+    def _remaining(self):
+        if self.max_seconds is not None and time.time() - self.t0 >= self.max_seconds:
+            return 0
+        if self.max_evals is not None:
+            return max(0, self.max_evals - self.evals)
+        return math.inf
+
+    # --- Evaluation ---
+    def _params(self, point):
+        return {k: self.param_grid[k][i] for k, i in zip(self.keys, point)}
+
+    def _score(self, row, fraction=1.0):
+        if row is None or row['Total Trades'] < math.floor((self.min_trades or 0) * fraction):
+            return -math.inf
+        if self.max_drawdown is not None and row['Max Drawdown ($)'] < -self.max_drawdown:
+            return -math.inf
+        return row[self.objective]
+
+    def evaluate(self, points, fraction=1.0):
+        """Scores points on the first `fraction` of the data; cached points are free."""
+        todo = [p for p in dict.fromkeys(points) if (p, fraction) not in self.scores]
+        window, prune = None, {'min_trades': self.min_trades, 'max_drawdown': self.max_drawdown}
+        if fraction < 1.0:
+            end = self.df.index[max(1, int(len(self.df) * fraction))]
+            window = (None, end, end)
+            # Partial data: scale the floor, drawdown can only grow with more data
+            prune = {'min_trades': math.floor((self.min_trades or 0) * fraction) or None,
+                     'max_drawdown': self.max_drawdown}
+
+        # Slices keep the clock budget responsive
+        for i in range(0, len(todo), self.batch_size * 8):
+            remaining = self._remaining()
+            if remaining <= 0:
+                break
+            batch = todo[i:i + min(self.batch_size * 8, remaining)]
+            self._run_batch(batch, fraction, window, prune)
+
+        return [self.scores.get((p, fraction), -math.inf) for p in points]
+
+    def _run_batch(self, batch, fraction, window, prune):
+        groups = group_by_signal_params([self._params(p) for p in batch])
+        n_chunks = self.n_chunks or (cpu_count() * 4)
+        chunk_size = max(1, -(-len(groups) // n_chunks))
+        chunks = [groups[i:i + chunk_size] for i in range(0, len(groups), chunk_size)]
+        outputs = Parallel(n_jobs=-1)(
+            delayed(run_group_chunk_shared)(self.handle, chunk, window, prune, self.single_position)
+            for chunk in chunks
+        )
+
+        index = {k: {v: i for i, v in enumerate(self.param_grid[k])} for k in self.keys}
+        for p in batch:
+            self.scores[(p, fraction)] = -math.inf
+        for block, stats in outputs:
+            INSTRUMENTS.merge(stats.get('instruments'))
+            for row in block.to_dict('records'):
+                point = tuple(index[k][row[k]] for k in self.keys)
+                self.scores[(point, fraction)] = self._score(row, fraction)
+                if fraction == 1.0:
+                    self.rows[point] = row
+        self.evals += len(batch)
+
+    # --- Strategies ---
+    def _all_points(self):
+        return list(itertools.product(*[range(n) for n in self.sizes]))
+
+    def _random_points(self, n):
+        n = min(n, self.grid_size)
+        flat = self.rng.choice(self.grid_size, size=n, replace=False)
+        return [tuple(int(i) for i in np.unravel_index(f, self.sizes)) for f in flat]
+
+    def halving(self):
+        fractions = [self.eta ** -(self.rungs - 1 - r) for r in range(self.rungs)]
+        # Without a budget, start from a random 1/eta of the grid
+        n = max(1, self.grid_size // self.eta)
+        if self.max_evals is not None:
+            # rung r costs n / eta^r evaluations
+            cost = sum(self.eta ** -r for r in range(self.rungs))
+            n = min(self.grid_size, max(1, int(self.max_evals / cost)))
+        candidates = self._all_points() if n == self.grid_size else self._random_points(n)
+
+        for r, fraction in enumerate(fractions):
+            scores = self.evaluate(candidates, fraction)
+            print(f"  rung {r + 1}/{self.rungs}: {len(candidates):,} candidates on {fraction:.0%} of the data")
+            if r == self.rungs - 1:
+                break
+            ranked = [p for s, p in sorted(zip(scores, candidates), key=lambda t: -t[0]) if s > -math.inf]
+            keep = max(1, math.ceil(len(candidates) / self.eta))
+            candidates = ranked[:keep]
+            if not candidates:
+                break
+
+    def zoom(self):
+        stride = 2 ** math.ceil(math.log2(max(self.sizes) / 3)) if max(self.sizes) > 3 else 1
+        axes = [sorted(set(range(0, n, stride)) | {n - 1}) for n in self.sizes]
+        self.evaluate(list(itertools.product(*axes)))
+        print(f"  stride {stride}: {self.evals:,} evaluations")
+
+        while stride > 1:
+            stride //= 2
+            for point in self._leaders(self.top_k):
+                axes = [sorted({min(n - 1, max(0, i + d)) for d in (-stride, 0, stride)})
+                        for i, n in zip(point, self.sizes)]
+                self.evaluate(list(itertools.product(*axes)))
+            print(f"  stride {stride}: {self.evals:,} evaluations")
+
+    def guided(self, k=5, kappa=1.0, pool_size=4000):
+        if self.max_evals is None and self.max_seconds is None:
+            self.max_evals = max(self.batch_size, self.grid_size // 10)
+        scale = np.array([max(n - 1, 1) for n in self.sizes], dtype=float)
+
+        self.evaluate(self._random_points(self.batch_size * 2))
+        while self._remaining() > 0:
+            seen = [p for (p, f) in self.scores if f == 1.0]
+            if len(seen) >= self.grid_size:
+                break
+            X = np.array(seen) / scale
+            y = np.array([self.scores[(p, 1.0)] for p in seen])
+            valid = np.isfinite(y)
+            if not valid.any():
+                self.evaluate(self._random_points(self.batch_size))
+                continue
+            # Invalid points count as a bad score so the model steers away
+            floor, spread = y[valid].min(), y[valid].std() or 1.0
+            y = np.where(valid, y, floor - spread)
+
+            pool = set(self._random_points(pool_size // 2))
+            for point in self._leaders(max(1, len(seen) // 10)):
+                for _ in range(pool_size // 2 // max(1, len(seen) // 10)):
+                    step = self.rng.integers(-1, 2, size=len(self.sizes))
+                    pool.add(tuple(int(min(n - 1, max(0, i + d))) for i, d, n in zip(point, step, self.sizes)))
+            pool = [p for p in pool if (p, 1.0) not in self.scores]
+            if not pool:
+                break
+
+            P = np.array(pool) / scale
+            acquisition = np.empty(len(pool))
+            for i in range(0, len(pool), 256):
+                dist = np.sqrt(((P[i:i + 256, None, :] - X[None, :, :]) ** 2).sum(axis=2))
+                nearest = np.argsort(dist, axis=1)[:, :k]
+                predicted = y[nearest].mean(axis=1)
+                novelty = np.take_along_axis(dist, nearest, axis=1).mean(axis=1)
+                acquisition[i:i + 256] = predicted + kappa * spread * novelty
+
+            pick = np.argsort(-acquisition)[:self.batch_size]
+            self.evaluate([pool[i] for i in pick])
+
+    def _leaders(self, n):
+        full = [(s, p) for (p, f), s in self.scores.items() if f == 1.0 and s > -math.inf]
+        return [p for _, p in sorted(full, key=lambda t: -t[0])[:n]]
+
+    # --- Entry point ---
+    def run(self):
+        """Runs the chosen strategy; returns full-data results like Optimizer.optimize()."""
+        print(f"\n--- 🧭 ADAPTIVE SEARCH ({self.method}) ---")
+        print(f"Grid: {self.grid_size:,} combinations. Budget: "
+              f"{self.max_evals or '-'} evaluations / {self.max_seconds or '-'} s")
+        self.t0 = time.time()
+        with SharedDataset(self.df) as shared:
+            self.handle = shared.handle
+            getattr(self, self.method)()
+            self.handle = None
+
+        elapsed = time.time() - self.t0
+        results = pd.DataFrame(list(self.rows.values()))
+        print(f"\n--- Finished! {self.evals:,} evaluations "
+              f"({self.evals / self.grid_size:.1%} of the grid) in {elapsed:.1f}s. ---")
+        leaders = self._leaders(1)
+        if leaders:
+            print(f"Best {self.objective}: {self.scores[(leaders[0], 1.0)]}")
+        return results
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import uuid
+import numpy as np
+import pandas as pd
+from indicators import IndicatorBank
+
+# Per-process cache of attached datasets: name -> (DataFrame, IndicatorBank)
+_ATTACHED = {}
+
+class SharedDataset:
+    """
+    Publishes a DataFrame once as read-only memory-mapped NumPy columns.
+    Workers receive only the small `handle` and attach to it by name,
+    so the data is never pickled per task.
+    Text columns (e.g. 'session') are stored as int8 category codes.
+    """
+    def __init__(self, df, directory=None):
+        self.name = f"algo_{uuid.uuid4().hex[:12]}"
+        self.path = tempfile.mkdtemp(prefix=f"{self.name}_", dir=directory)
+        self.handle = self._publish(df)
+
+    def _publish(self, df):
+        columns = {}
+        for col in df.columns:
+            values = df[col]
+            if values.dtype.kind in 'fiub':
+                np.save(os.path.join(self.path, f"{col}.npy"), values.to_numpy())
+                columns[col] = None
+            else:
+                cat = pd.Categorical(values)
+                # pandas picks the smallest int dtype that holds every code (int8 up to 127 categories)
+                np.save(os.path.join(self.path, f"{col}.npy"), np.asarray(cat.codes))
+                columns[col] = list(cat.categories)
+
+        np.save(os.path.join(self.path, "__index__.npy"), df.index.values)
+        return {
+            'name': self.name,
+            'path': self.path,
+            'columns': columns,
+            'index_name': df.index.name,
+            'length': len(df),
+        }
+
+    def close(self):
+        _ATTACHED.pop(self.name, None)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(handle):
+    """
+    Returns (DataFrame, IndicatorBank) for a published dataset.
+    The frame is a zero-copy view over the memory-mapped files and the
+    bank lives as long as the worker process, so it is shared by every
+    chunk that worker runs.
+    """
+    name = handle['name']
+    if name in _ATTACHED:
+        return _ATTACHED[name]
+
+    # Only keep the dataset currently being optimized
+    _ATTACHED.clear()
+
+    path = handle['path']
+    data = {}
+    for col, categories in handle['columns'].items():
+        values = np.load(os.path.join(path, f"{col}.npy"), mmap_mode='r')
+        if categories is None:
+            data[col] = values
+        else:
+            data[col] = pd.Categorical.from_codes(values, categories=categories)
+
+    index = pd.Index(np.load(os.path.join(path, "__index__.npy"), mmap_mode='r'),
+                     name=handle['index_name'])
+    df = pd.DataFrame(data, index=index, copy=False)
+
+    _ATTACHED[name] = (df, IndicatorBank(df))
+    return _ATTACHED[name]
@@ -1,26 +1,30 @@
 
+import numpy as np
 from indicators import Indicators
+from instrumentation import INSTRUMENTS
+
+DEFAULT_PARAMS = {
+    'sma_fast': 15,
+    'sma_slow': 100,
+    'sma_trend': 200,
+    'bb_period': 20,
+    'bb_std': 2.0,
+    'atr_period': 14,
+    'range_atr_filter': 0.8,
+    'sl_multiplier': 2.0,
+    'tp_multiplier': 5.0,
+    'be_multiplier': 100.0
+}
 
 class Strategy(Indicators):
     """
     Implements the trading logic: Trend + Hook + Volatility.
     Includes INT conversion fix to prevent 'SMA_200.0' errors.
     """
-    def __init__(self, df, params=None):
-        super().__init__(df)
+    def __init__(self, df, params=None, bank=None):
+        super().__init__(df, bank=bank)
         
-        self.default_params = {
-            'sma_fast': 15,
-            'sma_slow': 100,
-            'sma_trend': 200,
-            'bb_period': 20,
-            'bb_std': 2.0,
-            'atr_period': 14,
-            'range_atr_filter': 0.8,
-            'sl_multiplier': 2.0,
-            'tp_multiplier': 5.0,
-            'be_multiplier': 100.0
-        }
+        self.default_params = DEFAULT_PARAMS.copy()
         
         self.params = self.default_params.copy()
         if params:
@@ -31,6 +35,7 @@ class Strategy(Indicators):
         self._generate_signals()
         self._calculate_exit_levels()
 
+    @INSTRUMENTS.timed('signals')
     def _generate_signals(self):
         df = self.data
         p = self.params
@@ -50,10 +55,13 @@ class Strategy(Indicators):
         short_hook = (df['price'].shift(1) >= df['BB_upper'].shift(1)) & (df['price'] < df['BB_upper'])
         
         # 3. Volatility Filter
-        df['ATR_50'] = df[atr_col].rolling(50).mean()
+        if self.bank is not None:
+            df['ATR_50'] = self.bank.atr_baseline(p)
+        else:
+            df['ATR_50'] = self._mean(df[atr_col], 50)
         volatility_ok = df[atr_col] >= (p['range_atr_filter'] * df['ATR_50'])
 
-        df['position'] = 0
+        df['position'] = np.int8(0) if df['price'].dtype == np.float32 else 0
         df.loc[long_trend & long_hook & volatility_ok, 'position'] = 1
         df.loc[short_trend & short_hook & volatility_ok, 'position'] = -1
         
@@ -0,0 +1,181 @@
+import math
+from collections import deque
+from strategy import DEFAULT_PARAMS
+
+class RollingMean:
+    """O(1) rolling mean over the last `period` values (running sum)."""
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.pushes = 0
+
+    def push(self, x):
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        # Re-sum once per full window to stop floating-point drift (amortized O(1))
+        self.pushes += 1
+        if self.pushes % self.period == 0:
+            self.total = math.fsum(self.window)
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+    @property
+    def value(self):
+        return self.total / self.period if self.ready else math.nan
+
+
+class RollingMoments:
+    """O(1) rolling mean / sample std using Welford add-remove updates."""
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        if len(self.window) < self.period:
+            self.window.append(x)
+            n = len(self.window)
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+            return
+
+        old = self.window[0]
+        self.window.append(x)
+        old_mean = self.mean
+        self.mean += (x - old) / self.period
+        self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        if self.m2 < 0:
+            self.m2 = 0.0
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+    @property
+    def std(self):
+        if not self.ready or self.period < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.period - 1))
+
+
+class StreamingStrategy:
+    """
+    Bar-by-bar counterpart of Strategy for the live loop.
+    Keeps rolling state (SMA sums, Welford BB variance, TR/ATR windows) and
+    updates in constant time per closed bar, producing the same position and
+    SL/TP values the batch pipeline gives for that bar.
+    """
+    def __init__(self, params=None):
+        self.params = DEFAULT_PARAMS.copy()
+        if params:
+            self.params.update(params)
+        p = self.params
+
+        self.p_fast = int(p['sma_fast'])
+        self.p_slow = int(p['sma_slow'])
+        self.p_trend = int(p['sma_trend'])
+        self.p_atr = int(p['atr_period'])
+
+        self.sma_fast = RollingMean(self.p_fast)
+        self.sma_slow = RollingMean(self.p_slow)
+        self.sma_trend = RollingMean(self.p_trend)
+        self.bb = RollingMoments(int(p['bb_period']))
+        self.atr = RollingMean(self.p_atr)
+        self.atr_baseline = RollingMean(50)
+
+        self.prev_close = None
+        self.prev_price = None
+        self.prev_bb_upper = math.nan
+        self.prev_bb_lower = math.nan
+        self.last = None
+        self.bars = 0
+
+    def warm_up(self, df):
+        """Feeds historical closed bars (columns: price, High, Low, optional session)."""
+        has_session = 'session' in df.columns
+        sessions = df['session'].values if has_session else None
+        for i, (t, price, high, low) in enumerate(zip(df.index, df['price'].values,
+                                                     df['High'].values, df['Low'].values)):
+            self.update(high, low, price, session=sessions[i] if has_session else None, time=t)
+        return self.last
+
+    def update(self, high, low, price, session=None, time=None):
+        """Processes one closed bar and returns its signal row (dict)."""
+        p = self.params
+        high = float(high); low = float(low); price = float(price)
+
+        # 1. SMA
+        self.sma_fast.push(price)
+        self.sma_slow.push(price)
+        self.sma_trend.push(price)
+
+        # 2. Bollinger Bands
+        self.bb.push(price)
+        sigma = self.bb.std
+        bb_upper = self.bb.mean + (p['bb_std'] * sigma)
+        bb_lower = self.bb.mean - (p['bb_std'] * sigma)
+
+        # 3. ATR (first bar has no previous close -> High - Low)
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.atr.push(tr)
+        atr = self.atr.value
+        if self.atr.ready:
+            self.atr_baseline.push(atr)
+        atr_50 = self.atr_baseline.value
+
+        ready = (self.sma_fast.ready and self.sma_slow.ready and self.sma_trend.ready
+                 and self.bb.ready and self.atr_baseline.ready)
+
+        position = 0
+        if ready and self.prev_price is not None:
+            sma_fast = self.sma_fast.value
+            sma_slow = self.sma_slow.value
+            sma_trend = self.sma_trend.value
+
+            long_trend = price > sma_trend and sma_fast > sma_slow
+            short_trend = price < sma_trend and sma_fast < sma_slow
+            long_hook = self.prev_price <= self.prev_bb_lower and price > bb_lower
+            short_hook = self.prev_price >= self.prev_bb_upper and price < bb_upper
+            volatility_ok = atr >= (p['range_atr_filter'] * atr_50)
+
+            if long_trend and long_hook and volatility_ok:
+                position = 1
+            if short_trend and short_hook and volatility_ok:
+                position = -1
+            if session == 'deadzone':
+                position = 0
+
+        self.last = {
+            'time': time,
+            'price': price,
+            f"SMA_{self.p_fast}": self.sma_fast.value,
+            f"SMA_{self.p_slow}": self.sma_slow.value,
+            f"SMA_{self.p_trend}": self.sma_trend.value,
+            'BB_upper': bb_upper,
+            'BB_lower': bb_lower,
+            f"ATR_{self.p_atr}": atr,
+            'ATR_50': atr_50,
+            'ready': ready,
+            'position': position,
+            'long_sl_val': price - (atr * p['sl_multiplier']),
+            'long_tp_val': price + (atr * p['tp_multiplier']),
+            'short_sl_val': price + (atr * p['sl_multiplier']),
+            'short_tp_val': price - (atr * p['tp_multiplier']),
+        }
+
+        self.prev_close = price
+        self.prev_price = price
+        self.prev_bb_upper = bb_upper
+        self.prev_bb_lower = bb_lower
+        self.bars += 1
+        return self.last
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from metrics import batch_metrics, metrics_records
+
+TRADE_DTYPE = np.dtype([
+    ('entry_idx', np.int64),
+    ('exit_idx', np.int64),
+    ('side', np.int8),          # 1 long, -1 short
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('pnl_usd', np.float64),
+])
+
+
+class TradeLog:
+    """
+    Closed trades as one structured array (TRADE_DTYPE) plus the bar
+    datetimes they index into. Timestamps, trade types and durations are
+    only resolved by to_frame(), i.e. for reporting and plotting.
+    """
+    def __init__(self, records, datetimes):
+        self.records = records
+        self.datetimes = datetimes
+
+    @classmethod
+    def from_exits(cls, entries, exit_indices, exit_prices, datetimes, position_size):
+        """entries as returned by Backtester._entries; exit index -1 = never closed."""
+        entry_indices, entry_types, entry_prices, _ = entries
+        closed = exit_indices != -1
+        records = np.empty(int(closed.sum()), dtype=TRADE_DTYPE)
+        records['entry_idx'] = entry_indices[closed]
+        records['exit_idx'] = exit_indices[closed]
+        records['side'] = entry_types[closed]
+        opened, closed_at = entry_prices[closed], exit_prices[closed]
+        records['entry_price'] = opened
+        records['exit_price'] = closed_at
+        records['pnl_usd'] = np.where(entry_types[closed] == 1, (closed_at - opened) * position_size,
+                                      (opened - closed_at) * position_size)
+        return cls(records, datetimes)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def empty(self):
+        return len(self.records) == 0
+
+    @property
+    def pnl(self):
+        return self.records['pnl_usd']
+
+    @property
+    def durations(self):
+        return self.datetimes[self.records['exit_idx']] - self.datetimes[self.records['entry_idx']]
+
+    def metrics(self):
+        """Metrics dict, same as trade_metrics(self.to_frame())."""
+        return metrics_records(logs_metrics_block([self]))[0]
+
+    def to_frame(self):
+        """The classic trade log DataFrame (one row per closed trade)."""
+        if self.empty:
+            return pd.DataFrame()
+        r = self.records
+        entry_time = self.datetimes[r['entry_idx']]
+        exit_time = self.datetimes[r['exit_idx']]
+        return pd.DataFrame({
+            'entry_time': entry_time,
+            'exit_time': exit_time,
+            'trade_type': np.where(r['side'] == 1, 'Long', 'Short').astype(object),
+            'entry_price': r['entry_price'],
+            'exit_price': r['exit_price'],
+            'pnl_usd': r['pnl_usd'],
+            'duration': exit_time - entry_time,
+        })
+
+
+def logs_metrics_block(logs):
+    """batch_metrics over several TradeLogs (one row per log)."""
+    offsets = np.concatenate(([0], np.cumsum([len(log) for log in logs]))).astype(np.int64)
+    if not logs:
+        return batch_metrics([], np.array([], dtype='m8[ns]'), [], offsets)
+    return batch_metrics(np.concatenate([log.pnl for log in logs]),
+                         np.concatenate([log.durations for log in logs]),
+                         np.concatenate([log.records['exit_idx'] for log in logs]), offsets)
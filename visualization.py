@@ -1,32 +1,146 @@
-import matplotlib.pyplot as plt
-
-def plot_performance(df, trade_log, metrics):
-    print("Loading chart...")
-    plt.figure(figsize=(16, 8))
-    
-    plt.plot(df.index, df['price'], label='Price', color='black', alpha=0.6, linewidth=1)
-    
-    ma = df['price'].rolling(20).mean()
-    sd = df['price'].rolling(20).std()
-    plt.plot(df.index, ma + 2*sd, color='green', alpha=0.15, linestyle='--')
-    plt.plot(df.index, ma - 2*sd, color='red', alpha=0.15, linestyle='--')
+import base64
+import html
+import io
+import os
+import numpy as np
+from indicators import rolling_mean, rolling_std
 
-    if not trade_log.empty:
-        wins = trade_log[trade_log['pnl_usd'] > 0]
-        losses = trade_log[trade_log['pnl_usd'] <= 0]
-        
-        plt.scatter(wins['entry_time'], wins['entry_price'], c='green', marker='^', s=100, label='Win Entry', zorder=5)
-        plt.scatter(losses['entry_time'], losses['entry_price'], c='red', marker='v', s=100, label='Loss Entry', zorder=5)
-        plt.scatter(trade_log['exit_time'], trade_log['exit_price'], c='blue', marker='x', s=40, alpha=0.7, label='Exit')
+CHART_PIXELS = 1600     # plot width in pixels at figsize=(16, 8), dpi=100
+
+def minmax_indices(values, buckets):
+    """
+    Positions of the min and the max of `values` in each of `buckets`
+    equal slices (plus the first and last point), in order. At two points
+    per pixel column this draws the same line as every bar.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    starts = np.unique(np.linspace(0, n, buckets + 1).astype(np.int64)[:-1])
+    counts = np.diff(np.append(starts, n))
+    segment = np.repeat(np.arange(len(starts)), counts)
+    picks = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(values, starts)
+        hit = np.flatnonzero(values == extreme[segment])
+        _, first = np.unique(segment[hit], return_index=True)
+        picks.append(hit[first])
+    return np.unique(np.concatenate([[0, n - 1], *picks]))
+
+def lttb_indices(values, n_out):
+    """Largest-Triangle-Three-Buckets: n_out positions keeping the visual shape of the line."""
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = (nxt_lo + nxt_hi - 1) / 2, y[nxt_lo:max(nxt_hi, nxt_lo + 1)].mean()
+        x = np.arange(lo, hi)
+        area = np.abs((a - cx) * (y[lo:hi] - y[a]) - (a - x) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
 
+def downsample(values, pixels=CHART_PIXELS, method='minmax'):
+    """Indices to plot: None/0 pixels keeps every bar."""
+    if not pixels:
+        return np.arange(len(values))
+    if method == 'lttb':
+        return lttb_indices(values, 2 * pixels)
+    if method == 'minmax':
+        return minmax_indices(values, pixels)
+    raise ValueError(f"Unknown downsampling method '{method}'")
+
+def _bands(df):
+    """The strategy's Bollinger columns when Indicators already added them, else a 20 / 2.0 band."""
+    if 'BB_upper' in df.columns and 'BB_lower' in df.columns:
+        return df['BB_upper'].values, df['BB_lower'].values
+    ma = rolling_mean(df['price'], 20).values
+    sd = rolling_std(df['price'], 20).values
+    return ma + 2 * sd, ma - 2 * sd
+
+def _title(metrics):
     pf = metrics.get('Profit Factor', 0)
     profit = metrics.get('Total Profit ($)', 0)
     wr = metrics.get('Win Rate (%)', 0)
-    
-    title_str = f"FINAL RESULT: Profit ${profit} | PF: {pf} | WinRate: {wr}%"
-    plt.title(title_str, fontsize=14, fontweight='bold')
-    plt.legend(loc='upper left')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    
-    plt.show()
\ No newline at end of file
+    return f"FINAL RESULT: Profit ${profit} | PF: {pf} | WinRate: {wr}%"
+
+def _draw(ax, df, trade_log, metrics, pixels, method):
+    price = df['price'].values
+    idx = downsample(price, pixels, method)
+    times = df.index.values[idx]
+    upper, lower = _bands(df)
+
+    ax.plot(times, price[idx], label='Price', color='black', alpha=0.6, linewidth=1)
+    ax.plot(times, upper[idx], color='green', alpha=0.15, linestyle='--')
+    ax.plot(times, lower[idx], color='red', alpha=0.15, linestyle='--')
+
+    if not trade_log.empty:
+        wins = trade_log[trade_log['pnl_usd'] > 0]
+        losses = trade_log[trade_log['pnl_usd'] <= 0]
+
+        ax.scatter(wins['entry_time'], wins['entry_price'], c='green', marker='^', s=100, label='Win Entry', zorder=5)
+        ax.scatter(losses['entry_time'], losses['entry_price'], c='red', marker='v', s=100, label='Loss Entry', zorder=5)
+        ax.scatter(trade_log['exit_time'], trade_log['exit_price'], c='blue', marker='x', s=40, alpha=0.7, label='Exit')
+
+    ax.set_title(_title(metrics), fontsize=14, fontweight='bold')
+    ax.legend(loc='upper left')
+    ax.grid(True, alpha=0.3)
+
+def plot_performance(df, trade_log, metrics, output=None, pixels=CHART_PIXELS, method='minmax'):
+    """
+    Price, Bollinger band and trades. The price line is downsampled to
+    `pixels` buckets ('minmax' or 'lttb'; pixels=None draws every bar).
+
+    output=None opens a window as before. With a path ending in .png or
+    .html the chart is rendered off-screen (Agg, no display needed) and
+    written to that file; the HTML report embeds the PNG and the metrics.
+    Pass the Backtester's data to reuse its band columns.
+    """
+    if output is None:
+        import matplotlib.pyplot as plt
+        print("Loading chart...")
+        fig, ax = plt.subplots(figsize=(16, 8))
+        _draw(ax, df, trade_log, metrics, pixels, method)
+        fig.tight_layout()
+        plt.show()
+        return None
+
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(16, 8), dpi=CHART_PIXELS // 16)
+    _draw(fig.subplots(), df, trade_log, metrics, pixels, method)
+    fig.tight_layout()
+
+    ext = os.path.splitext(output)[1].lower()
+    if ext == '.png':
+        fig.savefig(output)
+    elif ext in ('.html', '.htm'):
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png')
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(_html_report(metrics, base64.b64encode(buf.getvalue()).decode('ascii')))
+    else:
+        raise ValueError(f"Unsupported chart file '{output}' (use .png or .html)")
+    print(f"📈 Chart written to '{output}'.")
+    return output
+
+def _html_report(metrics, png_b64):
+    rows = "\n".join(f"<tr><td>{html.escape(str(k))}</td><td>{html.escape(str(v))}</td></tr>"
+                     for k, v in metrics.items())
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(_title(metrics))}</title>
+<style>body{{font-family:sans-serif}} td{{padding:2px 12px}} tr:nth-child(even){{background:#f2f2f2}}</style>
+</head><body>
+<img src="data:image/png;base64,{png_b64}" style="max-width:100%">
+<table>
+{rows}
+</table>
+</body></html>
+"""
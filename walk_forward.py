@@ -0,0 +1,159 @@
+import pandas as pd
+from joblib import Parallel, delayed, cpu_count
+from backtester import Backtester, trade_metrics, print_summary
+from optimizer import Optimizer, group_by_signal_params
+from shared_data import SharedDataset, attach
+import itertools
+
+def run_walk_forward_chunk(handle, groups, train_windows, min_trades, objective, single_position=False):
+    """
+    Evaluates a chunk of signal groups on every train window at once.
+    Signals are generated once per group on the full history (indicators
+    come from the worker's shared IndicatorBank), then each window only
+    filters entries. Returns the best row per window (None if no combination
+    reached min_trades).
+    """
+    df, bank = attach(handle)
+    best = [None] * len(train_windows)
+    for signal_params, exit_variants in groups:
+        try:
+            bot = Backtester(df, params=signal_params, bank=bank, single_position=single_position)
+            per_window = bot.run_exit_variants(exit_variants, windows=train_windows)
+        except Exception as e:
+            continue
+        for w, results in enumerate(per_window):
+            for metrics, exit_params in zip(results, exit_variants):
+                if metrics['Total Trades'] < min_trades:
+                    continue
+                if best[w] is None or metrics[objective] > best[w][objective]:
+                    best[w] = {**metrics, **signal_params, **exit_params}
+    return best
+
+class WalkForward:
+    """
+    Walk-forward analysis: optimize on each train window, trade the chosen
+    parameters on the following test window, stitch the out-of-sample trades.
+
+    train_bars / test_bars: window sizes in bars; the windows roll forward by
+    test_bars. anchored=True keeps every train window starting at bar 0.
+    Indicators and signals are computed once on the full frame and shared by
+    all (overlapping) windows, so each window starts with warm indicators.
+    single_position: one trade at a time (live semantics); every window
+    starts flat.
+    """
+    def __init__(self, df, train_bars=3000, test_bars=1000, anchored=False,
+                 min_trades=30, objective='Total Profit ($)', param_grid=None, n_chunks=None,
+                 single_position=False):
+        self.df = df
+        self.single_position = single_position
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.anchored = anchored
+        self.min_trades = min_trades
+        self.objective = objective
+        self.param_grid = param_grid or Optimizer(df).get_monster_grid()
+        self.n_chunks = n_chunks
+        self.windows = self.split()
+        self.oos_trades = pd.DataFrame()
+        self.report = pd.DataFrame()
+        self.metrics = {}
+
+    def split(self):
+        """List of dicts with train/test (start, end) timestamps; end is exclusive (None = last bar)."""
+        index = self.df.index
+        n = len(index)
+
+        def ts(i):
+            return index[i] if i < n else None
+
+        windows = []
+        train_start, train_end = 0, self.train_bars
+        while train_end < n:
+            test_end = min(train_end + self.test_bars, n)
+            windows.append({
+                'train': (ts(train_start), ts(train_end)),
+                'test': (ts(train_end), ts(test_end)),
+            })
+            train_end = test_end
+            if not self.anchored:
+                train_start = train_end - self.train_bars
+        return windows
+
+    def run(self):
+        keys, values = zip(*self.param_grid.items())
+        combinations = [dict(zip(keys, v)) for v in itertools.product(*values)]
+        groups = group_by_signal_params(combinations)
+
+        print(f"\n--- 🚶 WALK-FORWARD ANALYSIS ---")
+        print(f"{len(self.windows)} windows ({'anchored' if self.anchored else 'rolling'}), "
+              f"{len(combinations):,} combinations per train window.")
+
+        # Train exits may not run past the train window (no peeking into the test period)
+        train_windows = [(w['train'][0], w['train'][1], w['train'][1]) for w in self.windows]
+
+        n_chunks = self.n_chunks or (cpu_count() * 4)
+        chunk_size = max(1, -(-len(groups) // n_chunks))
+        chunks = [groups[i:i + chunk_size] for i in range(0, len(groups), chunk_size)]
+
+        with SharedDataset(self.df) as shared:
+            outputs = Parallel(n_jobs=-1, verbose=1)(
+                delayed(run_walk_forward_chunk)(shared.handle, chunk, train_windows,
+                                                self.min_trades, self.objective, self.single_position)
+                for chunk in chunks
+            )
+
+        # Chunks are in grid order, so ties keep the first combination
+        champions = []
+        for w in range(len(self.windows)):
+            best = None
+            for chunk_best in outputs:
+                row = chunk_best[w]
+                if row is not None and (best is None or row[self.objective] > best[self.objective]):
+                    best = row
+            champions.append(best)
+
+        return self._test(champions)
+
+    def _test(self, champions):
+        rows = []
+        logs = []
+        for window, champion in zip(self.windows, champions):
+            row = {
+                'train_start': window['train'][0], 'train_end': window['train'][1],
+                'test_start': window['test'][0], 'test_end': window['test'][1],
+            }
+            if champion is None:
+                rows.append(row)
+                continue
+
+            params = {k: champion[k] for k in self.param_grid}
+            bot = Backtester(self.df, params=params, single_position=self.single_position)
+            # Test trades may exit after the window: that is their real outcome
+            oos = bot.run_exit_variants([params], windows=[(window['test'][0], window['test'][1], None)])[0][0]
+            logs.append(bot.trade_log)
+
+            row.update({f"IS {self.objective}": champion[self.objective],
+                        'IS Trades': champion['Total Trades']})
+            row.update({f"OOS {k}": v for k, v in oos.items()})
+            row.update(params)
+            rows.append(row)
+
+        self.report = pd.DataFrame(rows)
+        logs = [log for log in logs if not log.empty]
+        self.oos_trades = pd.concat(logs, ignore_index=True) if logs else pd.DataFrame()
+        self.metrics = trade_metrics(self.oos_trades)
+        return self.report
+
+    def equity_curve(self):
+        """Cumulative out-of-sample PnL indexed by exit time."""
+        if self.oos_trades.empty:
+            return pd.Series(dtype=float)
+        trades = self.oos_trades.sort_values('exit_time')
+        return trades.set_index('exit_time')['pnl_usd'].cumsum()
+
+    def print_summary(self):
+        cols = [c for c in ['test_start', 'test_end', 'sma_fast', 'sma_slow', 'sl_multiplier',
+                            'tp_multiplier', 'be_multiplier', f"IS {self.objective}",
+                            'OOS Total Trades', 'OOS Total Profit ($)'] if c in self.report.columns]
+        print(self.report[cols].to_string(index=False))
+        print_summary(self.metrics, title="🚶 WALK-FORWARD (OUT-OF-SAMPLE) REPORT")